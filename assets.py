@@ -0,0 +1,49 @@
+import os
+import pygame
+from settings import TILE_SIZE, TILE_TYPES, USE_TILE_ICONS
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+
+# One surface per color or icon, shared by every sprite that shows it.
+# Shared surfaces must never be drawn on.
+_surfaces = {}
+
+
+def _prepare(surface, alpha):
+    # convert() needs a display; headless runs keep the plain surface
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+def solid(color):
+    key = ("solid", tuple(color))
+    surface = _surfaces.get(key)
+    if surface is None:
+        surface = pygame.Surface((TILE_SIZE, TILE_SIZE))
+        surface.fill(color)
+        surface = _surfaces[key] = _prepare(surface, False)
+    return surface
+
+
+def icon(char):
+    # icons/<char>.png scaled to a tile, or None if there is no such file
+    key = ("icon", char)
+    if key not in _surfaces:
+        path = os.path.join(ICON_DIR, f"{char}.png")
+        surface = None
+        if os.path.exists(path):
+            surface = pygame.image.load(path)
+            if surface.get_size() != (TILE_SIZE, TILE_SIZE):
+                surface = pygame.transform.scale(surface, (TILE_SIZE, TILE_SIZE))
+            surface = _prepare(surface, True)
+        _surfaces[key] = surface
+    return _surfaces[key]
+
+
+def tile(char):
+    if USE_TILE_ICONS:
+        surface = icon(char)
+        if surface is not None:
+            return surface
+    return solid(TILE_TYPES[char])
@@ -0,0 +1,135 @@
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+import chunked_level
+
+AUTOSAVE_INTERVAL = 60  # Seconds between autosaves while there are changes
+AUTOSAVE_SUFFIX = ".autosave" + chunked_level.EXTENSION
+UNTITLED = "untitled"
+
+
+def autosave_path(file_path):
+    # level.json -> level.autosave.mlvc, next to the level being edited.
+    # Unsaved maps get a name per session so a new session never
+    # overwrites what an earlier one left behind after a crash.
+    if file_path:
+        return os.path.splitext(file_path)[0] + AUTOSAVE_SUFFIX
+    return f"{UNTITLED}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{AUTOSAVE_SUFFIX}"
+
+
+def newer_autosave(file_path):
+    # The autosave left next to file_path when it is newer than the level,
+    # typically by a session that crashed; None otherwise
+    path = autosave_path(file_path)
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(file_path):
+        return path
+    return None
+
+
+def set_aside_path(path):
+    # level.autosave.mlvc -> level.autosave-20240101-120000.mlvc
+    base = path[:-len(AUTOSAVE_SUFFIX)] if path.endswith(AUTOSAVE_SUFFIX) else path
+    return f"{base}.autosave-{time.strftime('%Y%m%d-%H%M%S')}{chunked_level.EXTENSION}"
+
+
+class Autosaver:
+    # Writes the editor's map to a chunked autosave file on a worker thread.
+    # The UI thread only copies the chunks changed since the last autosave
+    # (or the whole grid when the file needs rewriting); compressing and
+    # writing them happens on the worker. One autosave runs at a time.
+    def __init__(self, path, interval=AUTOSAVE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.dirty = None  # Chunk keys changed since the last autosave; None to rewrite the file
+        self.modified = False
+        self.claimed = False  # Whether this session has written path yet
+        self.executor = None
+        self.future = None
+        self.last_start = time.monotonic()
+        self.last_saved = None  # Wall clock time of the last finished autosave
+
+    def changed(self, keys):
+        self.modified = True
+        if self.dirty is not None:
+            self.dirty |= keys
+
+    def rewrite(self):
+        # The next autosave writes the whole map, e.g. after a resize
+        self.modified = True
+        self.dirty = None
+
+    def reset(self, path):
+        # For a newly loaded map; nothing needs saving until it changes
+        self.wait()
+        self.path = path
+        self.dirty = None
+        self.modified = False
+        self.claimed = False
+        self.last_start = time.monotonic()
+
+    def update(self, tilemap, entities):
+        # Call once a frame
+        if self.future is not None and self.future.done():
+            self.finish()
+        if self.future is None and self.modified and time.monotonic() - self.last_start >= self.interval:
+            self.start(tilemap, entities)
+
+    def start(self, tilemap, entities):
+        if not self.claimed:
+            # Never replace what an earlier session left at path, such as
+            # the work from before a crash; move it aside first
+            if os.path.exists(self.path):
+                try:
+                    os.replace(self.path, set_aside_path(self.path))
+                except OSError as e:
+                    print(f"Autosave skipped, could not move {self.path} aside: {e}")
+                    self.last_start = time.monotonic()
+                    return
+            self.claimed = True
+            self.dirty = None
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        # Entity property dicts are replaced on edit, never changed in place
+        entities = dict(entities)
+        if self.dirty is None:
+            self.future = self.executor.submit(chunked_level.save_full, self.path, tilemap.copy(), entities)
+        else:
+            chunks = [
+                (key, chunked_level.chunk_cells(tilemap, key, chunked_level.CHUNK_SIZE).copy())
+                for key in sorted(self.dirty)
+            ]
+            self.future = self.executor.submit(
+                chunked_level.append_chunks, self.path, tilemap.cols, tilemap.rows, chunks, entities
+            )
+        self.dirty = set()
+        self.modified = False
+        self.last_start = time.monotonic()
+
+    def finish(self):
+        future, self.future = self.future, None
+        try:
+            if future.result() is False:
+                self.rewrite()
+                return
+        except (OSError, ValueError, struct.error) as e:
+            # A damaged file is rewritten from scratch next time
+            print(f"Autosave to {self.path} failed: {e}")
+            self.rewrite()
+            return
+        self.last_saved = time.time()
+
+    def wait(self):
+        if self.future is not None:
+            self.finish()
+
+    def flush(self, tilemap, entities):
+        # Saves outstanding changes and waits for the write, e.g. on exit
+        self.wait()
+        if self.modified:
+            self.start(tilemap, entities)
+            self.wait()
+            if self.modified:
+                # The file could not take an incremental save
+                self.start(tilemap, entities)
+                self.wait()
@@ -0,0 +1,322 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks run without a window; set before pygame opens a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from settings import TILE_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, FPS, PHYSICS_HZ
+from player import Player
+from level import Level
+from inputs import HeldInput, KEY_BITS
+from tilemap import TileMap, CODES
+from entities import EntityStore, SpatialHash, ENEMY
+import enemy
+
+COLLISION_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LINEAR_SCAN_LIMIT = 100_000  # Scanning every tile gets too slow past this
+FRAMES = 2000
+ENEMY_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000]
+ENEMY_FRAMES = 200
+LEVEL_SIZES = [(100, 20), (1_000, 50), (10_000, 100)]
+LEVEL_FRAMES = 300
+LOAD_REPEATS = 3
+EDITOR_SIZES = [(30, 20), (100, 100), (300, 300)]
+EDITOR_REPEATS = 5
+REGRESSION_TOLERANCE = 1.25  # Slowdown ratio that counts as a regression
+
+
+def make_tiles(count):
+    # Square block of solid tiles with one empty row through the middle
+    side = math.isqrt(count)
+    gap_row = side // 2
+    tilemap = TileMap(side, side + 1)
+    tilemap.cells[:] = CODES["G"]
+    tilemap.cells[gap_row] = CODES[" "]
+    return tilemap, gap_row
+
+
+def time_collision(tiles, player_pos, frames=FRAMES):
+    player = Player(*player_pos)
+    start = time.perf_counter()
+    for _ in range(frames):
+        player.pos.update(player_pos)
+        player.direction.y = 0
+        player.apply_gravity()
+        player.move(tiles)
+    return (time.perf_counter() - start) / frames
+
+
+class LinearScan(list):
+    # The old behaviour: every tile is a collision candidate and the
+    # player is pushed out of overlaps on the y axis only
+    def move(self, x, y, width, height, dx, dy):
+        rect = pygame.Rect(round(x + dx), round(y + dy), width, height)
+        hit = False
+        for tile_rect in self:
+            if rect.colliderect(tile_rect):
+                hit = True
+                if dy > 0:
+                    rect.bottom = tile_rect.top
+                elif dy < 0:
+                    rect.top = tile_rect.bottom
+        return rect.x, rect.y, False, hit
+
+
+def bench_collision():
+    print(f"{'tiles':>10} {'grid us/frame':>15} {'scan us/frame':>15}")
+    results = []
+    for count in COLLISION_SIZES:
+        tiles, gap_row = make_tiles(count)
+        side = math.isqrt(count)
+        player_pos = ((side // 2) * TILE_SIZE + 5, gap_row * TILE_SIZE)
+
+        grid_time = time_collision(tiles, player_pos)
+
+        scan_time = None
+        if count <= LINEAR_SCAN_LIMIT:
+            everything = pygame.Rect(0, 0, tiles.cols * TILE_SIZE, tiles.rows * TILE_SIZE)
+            scan = LinearScan(tiles.solid_rects(everything))
+            scan_time = time_collision(scan, player_pos, frames=max(1, FRAMES * 1_000 // count))
+
+        scan_text = f"{scan_time * 1e6:15.2f}" if scan_time is not None else f"{'-':>15}"
+        print(f"{count:>10} {grid_time * 1e6:15.2f} {scan_text}")
+        results.append({"tiles": count, "grid": grid_time, "scan": scan_time})
+    return results
+
+
+def make_enemy_level(count, seed=0):
+    # Rows of platforms with gaps, enemies dropped at random columns
+    rng = random.Random(seed)
+    cols, rows = 1000, max(8, count // 100 * 4)
+    tilemap = TileMap(cols, rows)
+    for row in range(3, rows, 4):
+        tilemap.cells[row] = CODES["G"]
+        for gap in range(rng.randrange(20), cols, 40):
+            tilemap.cells[row, gap:gap + 3] = CODES[" "]
+
+    store = EntityStore()
+    for _ in range(count):
+        row = rng.randrange(3, rows, 4) - 1
+        enemy.spawn(store, rng.randrange(cols) * TILE_SIZE, row * TILE_SIZE)
+    return tilemap, store
+
+
+def bench_enemies():
+    print(f"{'enemies':>10} {'us/frame':>15} {'ns/enemy':>15}")
+    results = []
+    for count in ENEMY_COUNTS:
+        tilemap, store = make_enemy_level(count)
+        start = time.perf_counter()
+        for _ in range(ENEMY_FRAMES):
+            enemy.update(store, tilemap, 0.5)
+        frame_time = (time.perf_counter() - start) / ENEMY_FRAMES
+        print(f"{count:>10} {frame_time * 1e6:15.2f} {frame_time / count * 1e9:15.1f}")
+        results.append({"enemies": count, "frame": frame_time})
+    return results
+
+
+def bench_broadphase():
+    # Player-vs-enemy lookup: full vectorized scan against the spatial hash,
+    # and the per-tick hash update when nothing changed bucket
+    print(f"{'enemies':>10} {'scan us':>15} {'hash us':>15} {'update us':>15}")
+    results = []
+    probe = pygame.Rect(500 * TILE_SIZE, 2 * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+    for count in ENEMY_COUNTS:
+        tilemap, store = make_enemy_level(count)
+        broadphase = SpatialHash(store)
+        broadphase.update()
+        timings = []
+        for lookup in (store.overlapping, broadphase.query):
+            start = time.perf_counter()
+            for _ in range(FRAMES):
+                lookup(probe, ENEMY)
+            timings.append((time.perf_counter() - start) / FRAMES)
+        update = average(broadphase.update, FRAMES)
+        print(f"{count:>10} {timings[0] * 1e6:15.2f} {timings[1] * 1e6:15.2f} {update * 1e6:15.2f}")
+        results.append({"enemies": count, "scan": timings[0], "hash": timings[1], "update": update})
+    return results
+
+
+def make_layout(cols, rows, seed=0):
+    # Ground along the bottom with floating platforms, coins and enemies
+    rng = random.Random(seed)
+    grid = [[" "] * cols for _ in range(rows)]
+    grid[-1] = ["G"] * cols
+    for _ in range(cols * rows // 40):
+        col, row = rng.randrange(cols - 5), rng.randrange(2, rows - 2)
+        width = rng.randint(2, 5)
+        grid[row][col:col + width] = "P" * width
+        roll = rng.random()
+        if roll < 0.3:
+            grid[row - 1][col] = "C"
+        elif roll < 0.4:
+            grid[row - 1][col] = "E"
+    grid[rows - 2][2] = "M"
+    return ["".join(row) for row in grid]
+
+
+def average(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def bench_level(sizes=LEVEL_SIZES, frames=LEVEL_FRAMES):
+    # Load, full frame, collision and HUD cost on generated levels
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    print(f"{'level':>12} {'load ms':>10} {'run us':>10} {'collide us':>10} {'hud us':>10}")
+    results = []
+    for cols, rows in sizes:
+        layout = make_layout(cols, rows)
+        controls = HeldInput()
+        # Best of a few loads; the first one also pays for asset creation
+        load = math.inf
+        for _ in range(LOAD_REPEATS):
+            start = time.perf_counter()
+            level = Level(layout, screen, controls)
+            load = min(load, time.perf_counter() - start)
+
+        controls.hold(KEY_BITS[pygame.K_RIGHT])
+        run = average(level.run, frames)
+        collide = average(level.handle_collisions, frames)
+        hud = average(lambda: level.hud.draw(screen, level.player), frames)
+
+        size = f"{cols}x{rows}"
+        print(f"{size:>12} {load * 1e3:10.2f} {run * 1e6:10.1f} {collide * 1e6:10.1f} {hud * 1e6:10.1f}")
+        results.append({"size": size, "load": load, "run": run, "collide": collide, "hud": hud})
+    return results
+
+
+def bench_editor(sizes=EDITOR_SIZES, repeats=EDITOR_REPEATS):
+    # Editor redraw (cold chunk cache and warm), JSON save and load, and
+    # undo history
+    from level_editor import LevelEditor
+
+    editor = LevelEditor()
+    path = os.path.join(tempfile.mkdtemp(), "level.json")
+    print(f"{'grid':>12} {'cold ms':>10} {'draw ms':>10} {'save ms':>10} {'load ms':>10} {'undo us':>10}")
+    results = []
+    for cols, rows in sizes:
+        layout = make_layout(cols, rows)
+        editor.tilemap = TileMap.from_rows(layout)
+        editor.entity_properties = {}
+        editor.history.clear()
+        editor.chunk_cache.clear()
+
+        def cold_draw():
+            editor.chunk_cache.clear()
+            editor.draw()
+        draw_cold = average(cold_draw, repeats)
+        draw = average(editor.draw, repeats)
+        save = average(lambda: editor.save_level(path), repeats)
+        load = average(lambda: editor.load_level(path), repeats)
+
+        def stroke():
+            # One brush dab recorded, undone and redone
+            editor.begin_edit()
+            editor.paint_tiles(cols // 2, rows // 2)
+            editor.end_edit()
+            editor.undo()
+            editor.redo()
+        undo = average(stroke, repeats * 10)
+
+        size = f"{cols}x{rows}"
+        print(f"{size:>12} {draw_cold * 1e3:10.2f} {draw * 1e3:10.2f} {save * 1e3:10.2f} {load * 1e3:10.2f} {undo * 1e6:10.1f}")
+        results.append({"size": size, "draw_cold": draw_cold, "draw": draw, "save": save, "load": load, "undo": undo})
+    os.remove(path)
+    return results
+
+
+SUITES = {
+    "collision": bench_collision,
+    "enemies": bench_enemies,
+    "broadphase": bench_broadphase,
+    "level": bench_level,
+    "editor": bench_editor,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "physics_hz": PHYSICS_HZ,
+        "fps": FPS,
+    }
+
+
+def flatten(results):
+    # "suite[size].metric" -> seconds; the first field of a row is its size
+    flat = {}
+    for suite, rows in results.items():
+        for row in rows:
+            size, *metrics = row.items()
+            for name, value in metrics:
+                if value is not None:
+                    flat[f"{suite}[{size[1]}].{name}"] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    # Prints metrics that got slower than tolerance allows; returns how many
+    old, new = flatten(baseline["results"]), flatten(results)
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key] / old[key] if old[key] else 1.0
+        if ratio > tolerance:
+            regressions += 1
+            print(f"REGRESSION {key}: {old[key] * 1e6:.1f}us -> {new[key] * 1e6:.1f}us ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark game and editor hot paths without a window")
+    parser.add_argument("suites", nargs="*", help=f"Any of {', '.join(SUITES)}; defaults to all")
+    parser.add_argument("-o", "--output", metavar="FILE", help="Write results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="JSON from an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+    unknown = set(args.suites) - SUITES.keys()
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    pygame.init()
+    results = {}
+    for name in args.suites or SUITES:
+        print(f"== {name}")
+        results[name] = SUITES[name]()
+        print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"{regressions} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
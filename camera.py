@@ -0,0 +1,15 @@
+import pygame
+from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+
+class Camera:
+    # Tracks the visible part of the level in world coordinates
+    def __init__(self, level_width, level_height, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.view = pygame.Rect(0, 0, width, height)
+        self.bounds = pygame.Rect(0, 0, max(level_width, width), max(level_height, height))
+
+    def follow(self, rect):
+        self.view.center = rect.center
+        self.view.clamp_ip(self.bounds)
+
+    def apply(self, rect):
+        return rect.move(-self.view.x, -self.view.y)
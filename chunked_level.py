@@ -0,0 +1,161 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from level_format import CompiledLevel, TILE_CODES, ENTITY_TILES, EMPTY
+from tilemap import TileMap, CODES
+
+# Chunked level layout for big editor maps: a header, zlib-compressed
+# chunks of tile codes, then an index of the chunks followed by the entity
+# properties as JSON. Chunks that are entirely empty are not stored.
+# An incremental save appends only the changed chunks and a new index, and
+# repoints the header last, so an interrupted save leaves the previous
+# index in place.
+MAGIC = b"MLVC"
+VERSION = 1
+EXTENSION = ".mlvc"
+CHUNK_SIZE = 256
+HEADER = struct.Struct("<4sBIIHQ")  # magic, version, cols, rows, chunk size, index offset
+INDEX_HEADER = struct.Struct("<II")  # chunk count, entity JSON length
+INDEX_ENTRY = struct.Struct("<IIQI")  # cx, cy, data offset, data length
+COMPACT_RATIO = 2  # Rewrite the whole file once it is this much bigger than its live data
+
+
+def chunk_keys(col, row, width, height, chunk_size=CHUNK_SIZE):
+    # Keys of the chunks a cell rectangle overlaps
+    return {
+        (cx, cy)
+        for cy in range(max(row, 0) // chunk_size, (row + height - 1) // chunk_size + 1)
+        for cx in range(max(col, 0) // chunk_size, (col + width - 1) // chunk_size + 1)
+    }
+
+
+def chunk_cells(tilemap, key, chunk_size):
+    cx, cy = key
+    return tilemap.cells[cy * chunk_size:(cy + 1) * chunk_size, cx * chunk_size:(cx + 1) * chunk_size]
+
+
+def write_chunks(f, chunks, index):
+    # Appends (key, cells) chunks at the end of f and updates index; chunks
+    # that are now empty are dropped from it
+    for key, cells in chunks:
+        if not cells.size or not cells.any():
+            index.pop(key, None)
+            continue
+        data = zlib.compress(cells.tobytes(), 1)
+        index[key] = (f.tell(), len(data))
+        f.write(data)
+
+
+def write_index(f, index, entities):
+    encoded = json.dumps({f"{x},{y}": props for (x, y), props in entities.items()}).encode("utf-8")
+    offset = f.tell()
+    f.write(INDEX_HEADER.pack(len(index), len(encoded)))
+    f.write(b"".join(INDEX_ENTRY.pack(cx, cy, start, length) for (cx, cy), (start, length) in index.items()))
+    f.write(encoded)
+    return offset
+
+
+def read_header(f):
+    magic, version, cols, rows, chunk_size, index_offset = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} chunked level")
+    return cols, rows, chunk_size, index_offset
+
+
+def read_index(f, index_offset):
+    size = f.seek(0, os.SEEK_END)
+    f.seek(index_offset)
+    count, props_length = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+    if index_offset + INDEX_HEADER.size + count * INDEX_ENTRY.size + props_length > size:
+        raise ValueError("chunk index runs past the end of the file")
+    table = f.read(count * INDEX_ENTRY.size)
+    index = {(cx, cy): (start, length) for cx, cy, start, length in INDEX_ENTRY.iter_unpack(table)}
+    props = json.loads(f.read(props_length)) if props_length else {}
+    entities = {tuple(map(int, key.split(","))): value for key, value in props.items()}
+    return index, entities
+
+
+def save_full(path, tilemap, entities, chunk_size=CHUNK_SIZE):
+    # Writes a fresh, compact file next to path and renames it into place
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    cols_chunks = -(-tilemap.cols // chunk_size)
+    rows_chunks = -(-tilemap.rows // chunk_size)
+    index = {}
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tilemap.cols, tilemap.rows, chunk_size, 0))
+        keys = [(cx, cy) for cy in range(rows_chunks) for cx in range(cols_chunks)]
+        write_chunks(f, ((key, chunk_cells(tilemap, key, chunk_size)) for key in keys), index)
+        index_offset = write_index(f, index, entities)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, tilemap.cols, tilemap.rows, chunk_size, index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def append_chunks(path, cols, rows, chunks, entities):
+    # Incremental save of (key, cells) chunks cut at CHUNK_SIZE. Returns
+    # False when path needs a save_full() instead: it is missing, damaged,
+    # has other dimensions or has grown too big.
+    if not os.path.exists(path):
+        return False
+    with open(path, "r+b") as f:
+        try:
+            header = read_header(f)
+            if header[:3] != (cols, rows, CHUNK_SIZE):
+                return False
+            index, _ = read_index(f, header[3])
+        except (ValueError, struct.error):
+            # Damaged header or index
+            return False
+        f.seek(0, os.SEEK_END)
+        write_chunks(f, chunks, index)
+        index_offset = write_index(f, index, entities)
+        f.flush()
+        os.fsync(f.fileno())
+        # The new index only becomes visible with this last write
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, cols, rows, CHUNK_SIZE, index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.seek(0, os.SEEK_END)
+    live = sum(length for _, length in index.values())
+    return size <= COMPACT_RATIO * live + 1_000_000
+
+
+def save(path, tilemap, entities, dirty=None):
+    # dirty is the set of chunk keys changed since path was last saved from
+    # this map, or None to write everything
+    if dirty is not None:
+        chunks = ((key, chunk_cells(tilemap, key, CHUNK_SIZE)) for key in sorted(dirty))
+        if append_chunks(path, tilemap.cols, tilemap.rows, chunks, entities):
+            return
+    save_full(path, tilemap, entities)
+
+
+def load(path):
+    # Returns (TileMap, entity properties keyed by (x, y))
+    with open(path, "rb") as f:
+        cols, rows, chunk_size, index_offset = read_header(f)
+        index, entities = read_index(f, index_offset)
+        tilemap = TileMap(cols, rows)
+        for key, (start, length) in index.items():
+            f.seek(start)
+            cells = chunk_cells(tilemap, key, chunk_size)
+            cells[:] = np.frombuffer(zlib.decompress(f.read(length)), np.uint8).reshape(cells.shape)
+    return tilemap, entities
+
+
+def compile_chunked(path):
+    # CompiledLevel for the game, with entity cells moved to the entity table
+    tilemap, props = load(path)
+    cells = tilemap.cells
+    rows, cols = np.nonzero(np.isin(cells, [CODES[char] for char in ENTITY_TILES]))
+    entities = [
+        (TILE_CODES[cells[row, col]], col, row, props.get((col, row), {}))
+        for row, col in zip(rows.tolist(), cols.tolist())
+    ]
+    cells[rows, cols] = EMPTY
+    return CompiledLevel(tilemap.cols, tilemap.rows, bytearray(cells.tobytes()), entities)
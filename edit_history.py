@@ -0,0 +1,132 @@
+from collections import deque
+
+HISTORY_LIMIT = 5000
+
+
+class Edit:
+    # One undo step: the cells and entity properties a stroke, paste or
+    # resize changed, with their values before and after. Memory grows with
+    # the size of the edit, not the size of the map.
+    def __init__(self):
+        # Changed cells in the order they were recorded, each one of
+        #   ("rect", col, row, before, after) with TileMap blocks
+        #   ("cells", cols, rows, before, after) with code arrays
+        #   ("runs", runs, before, after) with (row, start, stop) runs of
+        #   cells that all had one code and all get one code
+        self.regions = []
+        self.entities = {}  # (x, y) -> [before, after]; None when absent
+        self.size = None  # ((cols, rows) before, (cols, rows) after) for resizes
+
+    def record(self, tilemap, entities, col, row, width, height):
+        # Call before changing a rectangle of cells. Entities added to it
+        # afterwards need record_entity(); the first recorded value wins.
+        rows, cols = tilemap.clip(col, row, width, height)
+        if rows.start == rows.stop or cols.start == cols.stop:
+            return
+        col, row = cols.start, rows.start
+        width, height = cols.stop - col, rows.stop - row
+        self.regions.append(["rect", col, row, tilemap.region(col, row, width, height), None])
+        for (x, y), props in entities.items():
+            if col <= x < col + width and row <= y < row + height:
+                self.entities.setdefault((x, y), [props, None])
+
+    def record_cells(self, tilemap, entities, cols, rows):
+        # Scattered cells such as a line; cols and rows must be on the map
+        self.regions.append(["cells", cols, rows, tilemap.cells[rows, cols], None])
+        for key in set(zip(cols.tolist(), rows.tolist())) & entities.keys():
+            self.entities.setdefault(key, [entities[key], None])
+
+    def record_runs(self, tilemap, entities, runs):
+        # Row runs that all hold the same code, such as a flood fill
+        row, start, _ = runs[0]
+        self.regions.append(["runs", runs, tilemap.cells[row, start], None])
+        by_row = {}
+        for row, start, stop in runs:
+            by_row.setdefault(row, []).append((start, stop))
+        for (x, y), props in entities.items():
+            if any(start <= x < stop for start, stop in by_row.get(y, ())):
+                self.entities.setdefault((x, y), [props, None])
+
+    def record_entity(self, entities, x, y):
+        self.entities.setdefault((x, y), [entities.get((x, y)), None])
+
+    def finish(self, tilemap, entities):
+        for region in self.regions:
+            kind = region[0]
+            if kind == "rect":
+                _, col, row, before, _ = region
+                region[4] = tilemap.region(col, row, before.cols, before.rows)
+            elif kind == "cells":
+                region[4] = tilemap.cells[region[2], region[1]]
+            else:
+                row, start, _ = region[1][0]
+                region[3] = tilemap.cells[row, start]
+        for key, values in self.entities.items():
+            values[1] = entities.get(key)
+
+    def apply(self, tilemap, entities, undo):
+        # Returns the tile map, which is replaced when the edit resized it
+        if self.size is not None:
+            tilemap = tilemap.resized(*self.size[0 if undo else 1])
+        regions = reversed(self.regions) if undo else self.regions
+        for kind, *region in regions:
+            values = region[-2] if undo else region[-1]
+            if kind == "rect":
+                tilemap.paste(values, region[0], region[1])
+            elif kind == "cells":
+                tilemap.cells[region[1], region[0]] = values
+            else:
+                for row, start, stop in region[0]:
+                    tilemap.cells[row, start:stop] = values
+        for key, (before, after) in self.entities.items():
+            props = before if undo else after
+            if props is None:
+                entities.pop(key, None)
+            else:
+                entities[key] = props
+        return tilemap
+
+    def cells(self):
+        # (col, row, width, height) rectangles covering every changed cell
+        rects = []
+        for kind, *region in self.regions:
+            if kind == "rect":
+                col, row, before, _ = region
+                rects.append((col, row, before.cols, before.rows))
+            elif kind == "cells":
+                rects.extend((col, row, 1, 1) for col, row in zip(region[0].tolist(), region[1].tolist()))
+            else:
+                rects.extend((start, row, stop - start, 1) for row, start, stop in region[0])
+        return rects
+
+    def __bool__(self):
+        return bool(self.regions or self.entities or self.size)
+
+
+class EditHistory:
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def push(self, edit):
+        if edit:
+            self.undo_stack.append(edit)
+            self.redo_stack.clear()
+
+    def undo(self):
+        if self.undo_stack:
+            edit = self.undo_stack.pop()
+            self.redo_stack.append(edit)
+            return edit
+        return None
+
+    def redo(self):
+        if self.redo_stack:
+            edit = self.redo_stack.pop()
+            self.undo_stack.append(edit)
+            return edit
+        return None
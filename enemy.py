@@ -1,12 +1,75 @@
-import pygame
-from settings import TILE_SIZE
-
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill((200, 0, 0))
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-    def update(self):
-        pass  # Later add movement
+import numpy as np
+import assets
+from settings import TILE_SIZE, GRAVITY, ENEMY_SPEED
+from entities import ENEMY
+
+# Enemies live in the level's EntityStore; these functions work on all of
+# them at once rather than one sprite at a time.
+
+def spawn(store, x, y, props=None, vx=None, vy=0.0):
+    # vx and vy restore an enemy that was streamed out; new enemies walk
+    # left at their editor-set speed
+    index = store.add(ENEMY, x, y, props)
+    if vx is None:
+        vx = -float(store.props[index].get("speed", ENEMY_SPEED))
+    store.vx[index], store.vy[index] = vx, vy
+    return index
+
+
+def image():
+    return assets.tile("E")
+
+
+def first_cell(start):
+    return np.floor_divide(start, TILE_SIZE).astype(int)
+
+
+def last_cell(end):
+    # Cell holding the last pixel of a span that ends (exclusive) at end
+    return np.ceil(end / TILE_SIZE).astype(int) - 1
+
+
+def update(store, tilemap, dt=1.0):
+    # Patrol: fall under gravity, walk, and turn around at walls and ledges
+    i = store.live(ENEMY)
+    if not len(i):
+        return
+    x, y, vx, vy = store.x[i], store.y[i], store.vx[i], store.vy[i]
+    left = first_cell(x)
+    right = last_cell(x + TILE_SIZE)
+
+    # Falls are swept a tile row at a time, like TileMap.sweep_axis, so
+    # fast enemies land on one-tile platforms instead of passing through
+    vy = vy + GRAVITY * dt
+    new_y = y + vy * dt
+    bottom = last_cell(new_y + TILE_SIZE)
+    row = np.minimum(last_cell(y + TILE_SIZE) + 1, bottom)
+    landed = np.zeros(len(i), bool)
+    check = vy > 0
+    while check.any():
+        hit = check & (tilemap.solid_at(left, row) | tilemap.solid_at(right, row))
+        landed |= hit
+        bottom = np.where(hit, row, bottom)
+        check &= ~hit & (row < bottom)
+        row = row + 1
+    y = np.where(landed, (bottom - 1) * TILE_SIZE, new_y)
+    vy = np.where(landed, 0, vy)
+
+    top = first_cell(y)
+    bottom = last_cell(y + TILE_SIZE)
+    below = bottom + 1
+    grounded = tilemap.solid_at(left, below) | tilemap.solid_at(right, below)
+
+    new_x = x + vx * dt
+    ahead = np.where(vx > 0, last_cell(new_x + TILE_SIZE), first_cell(new_x))
+    wall = tilemap.solid_at(ahead, top, outside=True) | tilemap.solid_at(ahead, bottom, outside=True)
+    ledge = grounded & ~tilemap.solid_at(ahead, below)
+    turn = wall | ledge
+    x = np.where(turn, x, new_x)
+    vx = np.where(turn, -vx, vx)
+
+    store.x[i], store.y[i], store.vx[i], store.vy[i] = x, y, vx, vy
+
+    # Enemies that fall off the bottom of the map are gone for good
+    for index in i[y > tilemap.rows * TILE_SIZE + TILE_SIZE]:
+        store.kill(index)
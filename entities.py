@@ -0,0 +1,172 @@
+import numpy as np
+from settings import TILE_SIZE, BROADPHASE_CELL
+
+ENEMY = 1
+
+
+class EntityStore:
+    # Struct-of-arrays storage for moving entities: one NumPy array per
+    # field so per-frame work runs over all entities at once. Slots of
+    # killed entities are reused by later adds.
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.free = []
+        self.props = []
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.kind = np.zeros(capacity, np.uint8)
+        self.alive = np.zeros(capacity, bool)
+
+    def __len__(self):
+        return self.size - len(self.free)
+
+    def grow(self):
+        for name in ("x", "y", "vx", "vy", "kind", "alive"):
+            old = getattr(self, name)
+            new = np.zeros(len(old) * 2, old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, kind, x, y, props=None):
+        if self.free:
+            index = self.free.pop()
+            self.props[index] = props or {}
+        else:
+            if self.size == len(self.x):
+                self.grow()
+            index = self.size
+            self.size += 1
+            self.props.append(props or {})
+        self.x[index], self.y[index] = x, y
+        self.vx[index] = self.vy[index] = 0
+        self.kind[index] = kind
+        self.alive[index] = True
+        return index
+
+    def kill(self, index):
+        if self.alive[index]:
+            self.alive[index] = False
+            self.free.append(index)
+
+    def live(self, kind=None):
+        mask = self.alive[:self.size]
+        if kind is not None:
+            mask = mask & (self.kind[:self.size] == kind)
+        return np.nonzero(mask)[0]
+
+    def overlapping(self, rect, kind=None):
+        # Indices of live entities whose TILE_SIZE box overlaps rect
+        n = self.size
+        x, y = self.x[:n], self.y[:n]
+        mask = (
+            self.alive[:n]
+            & (x < rect.right) & (x + TILE_SIZE > rect.left)
+            & (y < rect.bottom) & (y + TILE_SIZE > rect.top)
+        )
+        if kind is not None:
+            mask &= self.kind[:n] == kind
+        return np.nonzero(mask)[0]
+
+
+class SpatialHash:
+    # Broad phase for entity collisions: buckets entity indices by the
+    # grid cell of their top-left corner. update() only touches entities
+    # that changed cell, and queries only look at nearby buckets. Entity
+    # boxes must not be bigger than a cell.
+    NEIGHBOURS = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+    def __init__(self, store, cell_size=BROADPHASE_CELL):
+        self.store = store
+        self.cell_size = cell_size
+        self.buckets = {}  # (cx, cy) -> set of entity indices
+        self.cell_x = np.zeros(0, int)
+        self.cell_y = np.zeros(0, int)
+        self.inserted = np.zeros(0, bool)
+
+    def update(self):
+        # Most ticks nothing changes bucket; that case costs a few array
+        # ops, and an empty store none
+        store = self.store
+        if not len(store) and not self.buckets:
+            return
+        n = store.size
+        capacity = len(store.x)
+        if len(self.inserted) < capacity:
+            grown = capacity - len(self.inserted)
+            self.cell_x = np.concatenate([self.cell_x, np.zeros(grown, int)])
+            self.cell_y = np.concatenate([self.cell_y, np.zeros(grown, int)])
+            self.inserted = np.concatenate([self.inserted, np.zeros(grown, bool)])
+
+        alive = store.alive[:n]
+        cx = np.floor_divide(store.x[:n], self.cell_size).astype(int)
+        cy = np.floor_divide(store.y[:n], self.cell_size).astype(int)
+        inserted = self.inserted[:n]
+        changed = (alive != inserted) | (inserted & ((cx != self.cell_x[:n]) | (cy != self.cell_y[:n])))
+        if not changed.any():
+            return
+        moved = inserted & changed
+        for index in np.nonzero(moved)[0].tolist():
+            key = (self.cell_x[index], self.cell_y[index])
+            bucket = self.buckets[key]
+            bucket.discard(index)
+            if not bucket:
+                del self.buckets[key]
+        inserted[moved] = False
+
+        added = alive & ~inserted
+        for index, key in zip(np.nonzero(added)[0].tolist(), zip(cx[added].tolist(), cy[added].tolist())):
+            self.buckets.setdefault(key, set()).add(index)
+        self.cell_x[:n][added] = cx[added]
+        self.cell_y[:n][added] = cy[added]
+        inserted[added] = True
+
+    def candidates(self, rect):
+        # Indices in every bucket an entity touching rect could be in
+        size = self.cell_size
+        found = []
+        for cy in range((rect.top - TILE_SIZE) // size, (rect.bottom - 1) // size + 1):
+            for cx in range((rect.left - TILE_SIZE) // size, (rect.right - 1) // size + 1):
+                bucket = self.buckets.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return np.array(found, int)
+
+    def query(self, rect, kind=None):
+        # Same result as EntityStore.overlapping, from nearby buckets only
+        store = self.store
+        found = self.candidates(rect)
+        if not len(found):
+            return found
+        x, y = store.x[found], store.y[found]
+        mask = (x < rect.right) & (x + TILE_SIZE > rect.left) & (y < rect.bottom) & (y + TILE_SIZE > rect.top)
+        if kind is not None:
+            mask &= store.kind[found] == kind
+        return np.sort(found[mask])
+
+    def pairs(self, kind=None):
+        # Every overlapping (i, j) pair with i < j; each bucket is only
+        # compared with itself and half of its neighbours so no pair is
+        # tested twice
+        store = self.store
+        found = []
+        for (cx, cy), bucket in self.buckets.items():
+            a = np.array(list(bucket), int)
+            for dx, dy in self.NEIGHBOURS:
+                if (dx, dy) == (0, 0):
+                    b = a
+                else:
+                    other = self.buckets.get((cx + dx, cy + dy))
+                    if not other:
+                        continue
+                    b = np.array(list(other), int)
+                i, j = np.meshgrid(a, b, indexing="ij")
+                i, j = i.ravel(), j.ravel()
+                keep = i < j if b is a else i != j
+                if kind is not None:
+                    keep &= (store.kind[i] == kind) & (store.kind[j] == kind)
+                i, j = i[keep], j[keep]
+                hit = (np.abs(store.x[i] - store.x[j]) < TILE_SIZE) & (np.abs(store.y[i] - store.y[j]) < TILE_SIZE)
+                found.extend(zip(np.minimum(i, j)[hit].tolist(), np.maximum(i, j)[hit].tolist()))
+        return found
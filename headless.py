@@ -0,0 +1,43 @@
+import argparse
+import time
+from settings import FPS, PHYSICS_HZ
+from level import Level
+from inputs import ScriptedInput, KEY_BITS
+import pygame
+
+STEP_DT = FPS / PHYSICS_HZ
+
+
+def simulate(layout, masks, ticks=None, dt=STEP_DT):
+    # Steps a level with no display, fonts or window, feeding one key mask per tick
+    level = Level(layout, input_source=ScriptedInput(masks))
+    for _ in range(len(masks) if ticks is None else ticks):
+        level.update(dt)
+    return level
+
+
+def hold(mask, ticks):
+    return [mask] * ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a level without a window")
+    parser.add_argument("--level", type=int, default=0, help="Index into maps.levels")
+    parser.add_argument("--ticks", type=int, default=PHYSICS_HZ * 60)
+    args = parser.parse_args()
+
+    from maps import levels
+
+    # Walk right and keep jumping
+    masks = hold(KEY_BITS[pygame.K_RIGHT] | KEY_BITS[pygame.K_SPACE], args.ticks)
+    start = time.perf_counter()
+    level = simulate(levels[args.level], masks)
+    elapsed = time.perf_counter() - start
+
+    player = level.player
+    print(f"{args.ticks} ticks in {elapsed:.3f}s ({args.ticks / PHYSICS_HZ / elapsed:.0f}x real time)")
+    print(f"position={player.rect.topleft} score={player.score} health={player.health} lives={player.lives}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,48 @@
 import pygame
 from settings import SCREEN_WIDTH
 
-def draw_hud(screen, player):
-    font = pygame.font.SysFont("Arial", 24)
+HEALTH_POS = (20, 20)
+LIVES_POS = (20, 50)
+SCORE_POS = (SCREEN_WIDTH - 150, 20)
 
-    health_bar = pygame.Rect(20, 20, player.health * 2, 20)
-    pygame.draw.rect(screen, (255, 0, 0), health_bar)
+class Hud:
+    # Loads its font once and only re-renders text when the value changes
+    def __init__(self):
+        self.font = None
+        self.texts = {}
+        self.shown = None
 
-    lives = font.render(f"Lives: {player.lives}", True, (255, 255, 255))
-    screen.blit(lives, (20, 50))
+    def text(self, label, value, color):
+        cached = self.texts.get(label)
+        if cached is None or cached[0] != value:
+            if self.font is None:
+                self.font = pygame.font.SysFont("Arial", 24)
+            surface = self.font.render(f"{label}: {value}", True, color)
+            cached = self.texts[label] = (value, surface)
+        return cached[1]
 
-    score = font.render(f"Score: {player.score}", True, (255, 255, 0))
-    screen.blit(score, (SCREEN_WIDTH - 150, 20))
+    def health_rect(self, health):
+        return pygame.Rect(HEALTH_POS, (max(health, 0) * 2, 20))
+
+    def dirty_rects(self, player):
+        # Screen areas that differ from the last drawn HUD
+        if self.shown is None:
+            return []
+        health, lives, score = self.shown
+        rects = []
+        if player.health != health:
+            rects.append(self.health_rect(max(health, player.health)))
+        for label, old, new, pos, color in (
+            ("Lives", lives, player.lives, LIVES_POS, (255, 255, 255)),
+            ("Score", score, player.score, SCORE_POS, (255, 255, 0)),
+        ):
+            if old != new:
+                rects.append(self.texts[label][1].get_rect(topleft=pos))
+                rects.append(self.text(label, new, color).get_rect(topleft=pos))
+        return rects
+
+    def draw(self, screen, player):
+        pygame.draw.rect(screen, (255, 0, 0), self.health_rect(player.health))
+        screen.blit(self.text("Lives", player.lives, (255, 255, 255)), LIVES_POS)
+        screen.blit(self.text("Score", player.score, (255, 255, 0)), SCORE_POS)
+        self.shown = (player.health, player.lives, player.score)
@@ -0,0 +1,63 @@
+import pygame
+
+# Keys the player reads, packed into one bit each
+KEY_BITS = {
+    pygame.K_LEFT: 1,
+    pygame.K_RIGHT: 2,
+    pygame.K_SPACE: 4,
+}
+
+
+def to_mask(pressed):
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if pressed[key]:
+            mask |= bit
+    return mask
+
+
+class KeyState:
+    # Looks like the sequence returned by pygame.key.get_pressed()
+    __slots__ = ("mask",)
+
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+class KeyboardInput:
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+
+class ScriptedInput:
+    # Plays back one key mask per tick, then releases everything
+    def __init__(self, masks):
+        self.states = [KeyState(mask) for mask in masks]
+        self.tick = 0
+        self.idle = KeyState()
+
+    def get_pressed(self):
+        if self.tick >= len(self.states):
+            return self.idle
+        state = self.states[self.tick]
+        self.tick += 1
+        return state
+
+    @property
+    def finished(self):
+        return self.tick >= len(self.states)
+
+
+class HeldInput:
+    # Reports the same mask every tick until told otherwise
+    def __init__(self, mask=0):
+        self.state = KeyState(mask)
+
+    def hold(self, mask):
+        self.state.mask = mask
+
+    def get_pressed(self):
+        return self.state
@@ -1,68 +1,188 @@
 import pygame
-from tile import Tile
+import assets
 from player import Player
-from enemy import Enemy
-from hud import draw_hud
+from hud import Hud
+import enemy
+from entities import EntityStore, SpatialHash, ENEMY
+from static_layer import StaticLayer
+from camera import Camera
+from streaming import ChunkStreamer
+from profiler import Profiler
+from settings import BACKGROUND_COLOR, DIRTY_RECTS
+from level_format import CompiledLevel
+from tilemap import TileMap, COIN, EMPTY
+
+def merge_rects(rects):
+    # Unions overlapping rects so no area is redrawn twice
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
 
 class Level:
-    def __init__(self, layout, surface):
+    def __init__(self, layout, surface=None, input_source=None, profiler=None):
+        # Without a surface the level runs headless: physics only, no drawing
         self.display_surface = surface
-        self.tiles = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
+        self.headless = surface is None
+        self.input_source = input_source
+        self.profiler = profiler or Profiler()
+        self.hud = None if self.headless else Hud()
+
+        # Dirty-rect mode redraws only what changed since the last frame
+        self.dirty_rects = DIRTY_RECTS
+        self.redraw_all = True
+        self.drawn_rects = {}
+        self.removed_rects = []
+
+        self.tilemap = None
+        self.entities = EntityStore()
+        self.broadphase = SpatialHash(self.entities)
 
         self.player = None
+        self.contact_damage = 0.0  # Damage owed to the player, paid in whole points
 
         self.setup_level(layout)
 
     def setup_level(self, layout):
-        colors = {
-            "G": (50, 200, 50),
-            "P": (150, 75, 0),
-            "C": (255, 215, 0),
-        }
+        # layout is either a list of row strings or a CompiledLevel
+        if not isinstance(layout, CompiledLevel):
+            layout = CompiledLevel.from_rows(layout)
+        self.width = layout.cols * 32
+        self.height = layout.rows * 32
 
-        for row_index, row in enumerate(layout):
-            for col_index, cell in enumerate(row):
-                x = col_index * 32
-                y = row_index * 32
-
-                if cell in ["G", "P"]:
-                    self.tiles.add(Tile(x, y, colors[cell]))
-                elif cell == "C":
-                    coin = Tile(x, y, colors[cell])
-                    self.coins.add(coin)
-                elif cell == "E":
-                    self.enemies.add(Enemy(x, y))
-                elif cell == " ":
-                    continue
-                elif cell == "S":
-                    self.tiles.add(Tile(x, y, (255, 255, 255)))
-                elif cell == "M":  # Player start
-                    self.player = Player(x, y)
+        # Solid tiles and coins stay in the tile map; enemies go to the
+        # entity store and the player start becomes the player
+        self.tilemap = TileMap.from_compiled(layout)
+
+        spawns = []
+        for cell, col_index, row_index, props in layout.entities:
+            x = col_index * 32
+            y = row_index * 32
+
+            if cell == "E":
+                spawns.append((x, y, props))
+                self.tilemap.cells[row_index, col_index] = EMPTY
+            elif cell == "M":  # Player start
+                self.player = Player(x, y, self.input_source)
+                self.tilemap.cells[row_index, col_index] = EMPTY
 
         if not self.player:
-            self.player = Player(100, 100)
+            self.player = Player(100, 100, self.input_source)
+
+        self.static_layer = None
+        if not self.headless:
+            self.static_layer = StaticLayer(self.tilemap, {char: assets.tile(char) for char in "GPS"})
+            self.coin_image = assets.tile("C")
+
+        self.camera = Camera(self.width, self.height)
+        self.camera.follow(self.player.rect)
+
+        # Enemies are only spawned in chunks near the player
+        self.streamer = ChunkStreamer(self, spawns)
+        self.streamer.update(self.player.rect)
+        self.broadphase.update()
 
     def run(self):
-        self.tiles.draw(self.display_surface)
-        self.coins.draw(self.display_surface)
-        self.enemies.draw(self.display_surface)
+        self.update()
+        self.draw()
+
+    def update(self, dt=1.0):
+        section = self.profiler.section
+        with section("player"):
+            self.player.update(self.tilemap, dt)
+        with section("streaming"):
+            self.camera.follow(self.player.rect)
+            self.streamer.update(self.player.rect)
+
+        with section("enemies"):
+            enemy.update(self.entities, self.tilemap, dt)
+            self.broadphase.update()
+
+        with section("collisions"):
+            self.handle_collisions(dt)
+
+    def draw(self, alpha=1.0):
+        # Returns the screen rects that changed, for pygame.display.update()
+        if self.headless:
+            return []
+
+        # alpha blends the last two physics steps for smooth motion
+        player_rect = self.player.interpolated_rect(alpha)
+        old_view = self.camera.view.copy()
+        self.camera.follow(player_rect)
+        apply = self.camera.apply
+
+        # Screen (image, rect) of everything that can move, keyed by
+        # entity index or the player
+        view = self.camera.view
+        store = self.entities
+        indices = self.broadphase.query(view, ENEMY)
+        enemy_image = enemy.image()
+        moving = {
+            index: (enemy_image, pygame.Rect(x - view.x, y - view.y, 32, 32))
+            for index, x, y in zip(indices.tolist(), store.x[indices].astype(int).tolist(), store.y[indices].astype(int).tolist())
+        }
+        moving[self.player] = (self.player.image, apply(player_rect))
+
+        screen_rect = self.display_surface.get_rect()
+        if not self.dirty_rects or self.redraw_all or self.camera.view != old_view:
+            dirty = [screen_rect]
+        else:
+            dirty = [apply(rect) for rect in self.removed_rects]
+            dirty += self.hud.dirty_rects(self.player)
+            for key in moving.keys() | self.drawn_rects.keys():
+                old, new = self.drawn_rects.get(key), moving.get(key)
+                if old != new:
+                    dirty.extend(drawn[1] for drawn in (old, new) if drawn)
+            dirty = merge_rects([rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect)])
 
-        self.player.update(self.tiles)
-        self.display_surface.blit(self.player.image, self.player.rect)
+        for area in dirty:
+            self.draw_area(area, moving)
 
-        self.handle_collisions()
+        self.redraw_all = False
+        self.drawn_rects = moving
+        self.removed_rects.clear()
+        return dirty
 
-        draw_hud(self.display_surface, self.player)
+    def draw_area(self, area, moving):
+        # Redraws everything under one screen rect
+        section = self.profiler.section
+        surface = self.display_surface
+        world_area = area.move(self.camera.view.topleft)
+        surface.set_clip(area)
+        with section("draw background"):
+            surface.fill(BACKGROUND_COLOR, area)
+        with section("draw tiles"):
+            self.static_layer.draw(surface, self.camera.view)
+        with section("draw coins"):
+            coin = self.coin_image
+            surface.blits([(coin, (col * 32 - self.camera.view.x, row * 32 - self.camera.view.y))
+                           for col, row in self.tilemap.find(world_area, COIN)], False)
+        with section("draw sprites"):
+            surface.blits([(image, rect) for image, rect in moving.values() if rect.colliderect(area)], False)
+        with section("hud"):
+            self.hud.draw(surface, self.player)
+        surface.set_clip(None)
 
-    def handle_collisions(self):
-        for enemy in self.enemies:
-            if self.player.rect.colliderect(enemy.rect):
-                self.player.health -= 1
-                if self.player.health <= 0:
-                    self.player.lives -= 1
-                    self.player.health = 100
+    def handle_collisions(self, dt=1.0):
+        # Only enemies in the buckets around the player are tested; coins
+        # are looked up in the tile map cells under the player. Each enemy
+        # touching the player deals 1 damage per 1/FPS frame.
+        self.contact_damage += len(self.broadphase.query(self.player.rect, ENEMY)) * dt
+        damage = int(self.contact_damage)
+        self.contact_damage -= damage
+        for _ in range(damage):
+            self.player.health -= 1
+            if self.player.health <= 0:
+                self.player.lives -= 1
+                self.player.health = 100
 
-        hit_coins = pygame.sprite.spritecollide(self.player, self.coins, True)
+        hit_coins = self.tilemap.collect(self.player.rect, COIN)
+        for col, row in hit_coins:
+            self.removed_rects.append(pygame.Rect(col * 32, row * 32, 32, 32))
         self.player.score += len(hit_coins) * 10
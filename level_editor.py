@@ -1,6 +1,14 @@
 import pygame
 import json
 import sys
+import time
+from collections import OrderedDict
+import numpy as np
+from tilemap import TileMap, CODES, EMPTY
+from level_format import TILE_CODES
+from edit_history import Edit, EditHistory
+import chunked_level
+from autosave import Autosaver, autosave_path, newer_autosave
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 
@@ -12,7 +20,12 @@ UI_HEIGHT = 60
 FPS = 60
 TILE_SIZE = 32
 BRUSH_SIZES = [1, 3, 5]
-UNDO_LIMIT = 20
+TOOLS = ["brush", "fill", "rect", "hollow", "line"]
+MAX_GRID_SIZE = 10_000
+LARGE_MAP_CELLS = 1_000_000  # Bigger maps default to the chunked file format
+MIN_ZOOM, MAX_ZOOM = 0.1, 3.0
+CHUNK_TILES = 8  # Grid is drawn from cached chunks of CHUNK_TILES x CHUNK_TILES tiles
+MAX_CHUNK_PIXELS = 16_000_000  # Pixel budget for cached chunks across zoom levels
 
 # Colors
 COLORS = {
@@ -40,6 +53,12 @@ TILE_TYPES = {
 
 ENTITY_TILES = {"E", "C"}
 
+# Color per tile code, for drawing zoomed-out chunks a pixel per tile
+TILE_COLORS = np.full((256, 3), 255, np.uint8)
+for code, char in enumerate(TILE_CODES):
+    TILE_COLORS[code] = TILE_TYPES.get(char, ((255, 255, 255), "Unknown"))[0]
+SMALL_TILE = 6  # Tiles narrower than this are drawn without borders
+
 SHORTCUT_KEYS = {
     pygame.K_1: "G",
     pygame.K_2: "W",
@@ -50,9 +69,143 @@ SHORTCUT_KEYS = {
     pygame.K_0: " ",
 }
 
-# Helper: Tkinter root for dialogs (hidden)
-root = tk.Tk()
-root.withdraw()
+TOOL_KEYS = {
+    pygame.K_p: "brush",
+    pygame.K_f: "fill",
+    pygame.K_r: "rect",
+    pygame.K_h: "hollow",
+    pygame.K_l: "line",
+}
+
+
+def line_cells(x1, y1, x2, y2):
+    # Grid cells on the line between two cells, one per step along the
+    # longer axis, as column and row arrays
+    steps = max(abs(x2 - x1), abs(y2 - y1))
+    t = np.linspace(0, 1, steps + 1)
+    cols = np.rint(x1 + (x2 - x1) * t).astype(int)
+    rows = np.rint(y1 + (y2 - y1) * t).astype(int)
+    return cols, rows
+
+# Helper: Tkinter root for dialogs (hidden). Created on first use so the
+# editor can run without a Tk display, e.g. in benchmarks.
+root = None
+
+def dialog_root():
+    global root
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+    return root
+
+class ChunkCache:
+    # Pre-rendered grid chunks per zoom level. Only chunks in view are drawn,
+    # and edits re-render just the chunks holding changed cells.
+    def __init__(self, editor):
+        self.editor = editor
+        self.chunks = OrderedDict()  # (cx, cy, zoom) -> Surface
+        self.pixels = 0
+        self.zooms = set()
+        self.selected_tile = None
+
+    def clear(self):
+        self.chunks.clear()
+        self.pixels = 0
+        self.zooms.clear()
+
+    def invalidate(self, x, y, w=1, h=1):
+        if not self.chunks:
+            return
+        xs = range(max(x, 0) // CHUNK_TILES, (x + w - 1) // CHUNK_TILES + 1)
+        ys = range(max(y, 0) // CHUNK_TILES, (y + h - 1) // CHUNK_TILES + 1)
+        if len(xs) * len(ys) * len(self.zooms) > len(self.chunks):
+            # Large areas: cheaper to check the cached chunks
+            keys = [key for key in self.chunks if key[0] in xs and key[1] in ys]
+        else:
+            keys = [(cx, cy, zoom) for cy in ys for cx in xs for zoom in self.zooms]
+        for key in keys:
+            chunk = self.chunks.pop(key, None)
+            if chunk is not None:
+                self.pixels -= chunk.get_width() * chunk.get_height()
+
+    def invalidate_mask(self, mask):
+        # Drops cached chunks whose mask[cy, cx] is set, for edits that
+        # touch many scattered cells
+        if not self.chunks:
+            return
+        rows, cols = mask.shape
+        for key in [key for key in self.chunks if key[0] < cols and key[1] < rows and mask[key[1], key[0]]]:
+            chunk = self.chunks.pop(key)
+            self.pixels -= chunk.get_width() * chunk.get_height()
+
+    def render(self, cx, cy, zoom):
+        # Tiles sit at the same whole pixels as when the grid was drawn
+        # tile by tile, relative to the chunk's own origin
+        editor = self.editor
+        size = TILE_SIZE * zoom
+        x0, y0 = cx * CHUNK_TILES, cy * CHUNK_TILES
+        cols = min(CHUNK_TILES, editor.cols - x0)
+        rows = min(CHUNK_TILES, editor.rows - y0)
+        left, top = int(x0 * size), int(y0 * size)
+        xs = [int((x0 + x) * size) - left for x in range(cols)]
+        ys = [int((y0 + y) * size) - top for y in range(rows)]
+        width, height = xs[-1] + int(size), ys[-1] + int(size)
+        if int(size) < SMALL_TILE:
+            # Too small for borders and markers: scale up a pixel per tile
+            pixels = TILE_COLORS[editor.tilemap.cells[y0:y0 + rows, x0:x0 + cols]]
+            surface = pygame.transform.scale(pygame.surfarray.make_surface(pixels.transpose(1, 0, 2)), (width, height))
+            return surface.convert() if pygame.display.get_surface() is not None else surface
+        surface = pygame.Surface((width, height))
+        surface.fill(COLORS["background"])
+        grid = editor.tilemap.region(x0, y0, cols, rows).to_rows()
+        for row_index, (y, row) in enumerate(zip(ys, grid), y0):
+            for col_index, (x, tile) in enumerate(zip(xs, row), x0):
+                color = TILE_TYPES.get(tile, ((255, 255, 255), "Unknown"))[0]
+                rect = pygame.Rect(x, y, size, size)
+                pygame.draw.rect(surface, color, rect)
+                pygame.draw.rect(surface, COLORS["tile_border"], rect, 1)
+                if tile == editor.selected_tile:
+                    pygame.draw.rect(surface, COLORS["highlight"], rect, 3)
+                if (col_index, row_index) in editor.entity_properties:
+                    pygame.draw.rect(surface, (255, 0, 0, 100), rect, 3)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def get(self, cx, cy, zoom):
+        key = (cx, cy, zoom)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        chunk = self.chunks[key] = self.render(cx, cy, zoom)
+        self.zooms.add(zoom)
+        self.pixels += chunk.get_width() * chunk.get_height()
+        while self.pixels > MAX_CHUNK_PIXELS and len(self.chunks) > 1:
+            old = self.chunks.popitem(last=False)[1]
+            self.pixels -= old.get_width() * old.get_height()
+        return chunk
+
+    def draw(self, screen, area):
+        editor = self.editor
+        if editor.selected_tile != self.selected_tile:
+            # Tiles of the selected type are highlighted
+            self.clear()
+            self.selected_tile = editor.selected_tile
+        zoom = editor.zoom
+        size = TILE_SIZE * zoom
+        span = CHUNK_TILES * size
+        first_x = max(int((area.left - editor.offset_x) // span), 0)
+        first_y = max(int((area.top - editor.offset_y) // span), 0)
+        last_x = min(int((area.right - editor.offset_x) // span), (editor.cols - 1) // CHUNK_TILES)
+        last_y = min(int((area.bottom - editor.offset_y) // span), (editor.rows - 1) // CHUNK_TILES)
+        blits = []
+        for cy in range(first_y, last_y + 1):
+            for cx in range(first_x, last_x + 1):
+                pos = (editor.offset_x + int(cx * CHUNK_TILES * size), editor.offset_y + int(cy * CHUNK_TILES * size))
+                blits.append((self.get(cx, cy, zoom), pos))
+        screen.blits(blits, False)
+
 
 class Button:
     def __init__(self, rect, text, callback, font):
@@ -237,12 +390,20 @@ class LevelEditor:
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.clock = pygame.time.Clock()
 
-        self.cols, self.rows = 30, 20
-        self.grid = [[" " for _ in range(self.cols)] for _ in range(self.rows)]
+        self.tilemap = TileMap(30, 20)
         self.entity_properties = {}
+        self.chunk_cache = ChunkCache(self)
+        # Chunked saves only rewrite chunks changed since the last save to
+        # file_path; None means everything needs writing
+        self.file_path = None
+        self.dirty_chunks = None
+        self.autosave = Autosaver(autosave_path(None))
 
         self.selected_tile = "G"
         self.brush_index = 0
+        self.tool = "brush"
+        self.shape_start = None  # Cell where a rect or line drag began
+        self.shape_erase = False
         self.zoom = 1.0
         self.offset_x = 0
         self.offset_y = UI_HEIGHT
@@ -250,8 +411,10 @@ class LevelEditor:
         self.panning = False
         self.pan_start = (0, 0)
 
-        self.undo_stack = []
-        self.redo_stack = []
+        # Undo history of cell and entity deltas; edit is the stroke,
+        # paste or resize in progress
+        self.history = EditHistory()
+        self.edit = None
 
         self.buttons = []
         self.font = pygame.font.SysFont("consolas", 20)
@@ -303,7 +466,7 @@ class LevelEditor:
                         # Check UI buttons first
                         for b in self.buttons:
                             b.handle_event(event)
-                        if not any(b.rect.collidepoint(event.pos) for b in self.buttons):
+                        if self.in_tile_area(event.pos):
                             if self.copy_mode:
                                 # If copying, finalize copy rect
                                 if self.copy_start is None:
@@ -318,14 +481,12 @@ class LevelEditor:
                                     self.copy_mode = False
                                     self.copy_start = None
                             else:
-                                self.save_undo()
-                                self.paint_tiles(grid_x, grid_y)
+                                self.start_tool(grid_x, grid_y)
 
                     elif event.button == 3:
                         # Right click to erase
-                        if not any(b.rect.collidepoint(event.pos) for b in self.buttons):
-                            self.save_undo()
-                            self.paint_tiles(grid_x, grid_y, erase=True)
+                        if self.in_tile_area(event.pos):
+                            self.start_tool(grid_x, grid_y, erase=True)
 
                     elif event.button == 2:
                         # Middle mouse button to pan
@@ -334,15 +495,18 @@ class LevelEditor:
 
                     elif event.button == 4:
                         # Scroll up = zoom in
-                        self.zoom = min(3.0, self.zoom + 0.1)
+                        self.zoom = min(MAX_ZOOM, self.zoom + 0.1)
 
                     elif event.button == 5:
                         # Scroll down = zoom out
-                        self.zoom = max(0.5, self.zoom - 0.1)
+                        self.zoom = max(MIN_ZOOM, self.zoom - 0.1)
 
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if event.button == 2:
                         self.panning = False
+                    elif event.button in (1, 3):
+                        # A whole stroke or shape is one undo step
+                        self.finish_tool(grid_x, grid_y)
 
                 elif event.type == pygame.MOUSEMOTION:
                     for b in self.buttons:
@@ -355,8 +519,8 @@ class LevelEditor:
                         self.pan_start = event.pos
 
                     if pygame.mouse.get_pressed()[0]:
-                        if not any(b.rect.collidepoint(event.pos) for b in self.buttons) and not self.copy_mode:
-                            self.save_undo()
+                        if self.in_tile_area(event.pos) and not self.copy_mode and self.tool == "brush":
+                            self.begin_edit()
                             self.paint_tiles(grid_x, grid_y)
 
                     # Tooltip update
@@ -385,6 +549,10 @@ class LevelEditor:
                     elif event.key == pygame.K_b:
                         self.brush_index = (self.brush_index + 1) % len(BRUSH_SIZES)
 
+                    elif event.key in TOOL_KEYS and not (pygame.key.get_mods() & pygame.KMOD_CTRL):
+                        self.tool = TOOL_KEYS[event.key]
+                        self.shape_start = None
+
                     elif event.key == pygame.K_e:
                         # Edit properties of entity tile under mouse
                         if 0 <= grid_x < self.cols and 0 <= grid_y < self.rows:
@@ -394,66 +562,146 @@ class LevelEditor:
                                 editor = EntityPropertyEditor(self.screen, self.font, tile, current_props)
                                 new_props = editor.run()
                                 if new_props is not None:
+                                    self.begin_edit()
+                                    self.edit.record_entity(self.entity_properties, grid_x, grid_y)
                                     self.entity_properties[(grid_x, grid_y)] = new_props
+                                    self.changed(grid_x, grid_y)
+                                    self.end_edit()
                                 else:
                                     print("Edit cancelled")
 
+            self.autosave.update(self.tilemap, self.entity_properties)
             self.clamp_offset()
             self.draw()
             pygame.display.flip()
 
+        self.end_edit()
+        self.autosave.flush(self.tilemap, self.entity_properties)
         pygame.quit()
         sys.exit()
 
+    @property
+    def cols(self):
+        return self.tilemap.cols
+
+    @property
+    def rows(self):
+        return self.tilemap.rows
+
+    def in_tile_area(self, pos):
+        # The grid scrolls under the toolbar and status bar; clicks there
+        # must not reach the hidden cells
+        return UI_HEIGHT <= pos[1] < SCREEN_HEIGHT - UI_HEIGHT
+
     def screen_to_grid(self, sx, sy):
         gx = int((sx - self.offset_x) / (TILE_SIZE * self.zoom))
         gy = int((sy - self.offset_y) / (TILE_SIZE * self.zoom))
         return gx, gy
 
     def get_tile(self, x, y):
-        if 0 <= x < self.cols and 0 <= y < self.rows:
-            return self.grid[y][x]
+        if self.tilemap.in_bounds(x, y):
+            return self.tilemap.get(x, y)
         return None
 
     def set_tile(self, x, y, tile):
-        if 0 <= x < self.cols and 0 <= y < self.rows:
-            self.grid[y][x] = tile
+        if self.tilemap.in_bounds(x, y):
+            self.touch(x, y, 1, 1)
+            self.tilemap.set(x, y, tile)
             if tile not in ENTITY_TILES:
                 self.entity_properties.pop((x, y), None)
+            self.changed(x, y)
 
     def paint_tiles(self, x, y, erase=False):
         brush_size = BRUSH_SIZES[self.brush_index]
         half = brush_size // 2
         tile = " " if erase else self.selected_tile
-        for dy in range(-half, half + 1):
-            for dx in range(-half, half + 1):
-                self.set_tile(x + dx, y + dy, tile)
+        self.fill_cells(x - half, y - half, brush_size, brush_size, tile)
+
+    def fill_cells(self, x, y, w, h, tile):
+        self.touch(x, y, w, h)
+        self.tilemap.fill(x, y, w, h, tile)
+        self.changed(x, y, w, h)
+        if tile not in ENTITY_TILES:
+            if w * h < len(self.entity_properties):
+                for cell in [(cx, cy) for cy in range(y, y + h) for cx in range(x, x + w)]:
+                    self.entity_properties.pop(cell, None)
+            else:
+                for ex, ey in list(self.entity_properties):
+                    if x <= ex < x + w and y <= ey < y + h:
+                        del self.entity_properties[(ex, ey)]
+
+    def start_tool(self, x, y, erase=False):
+        if self.tool == "brush":
+            self.begin_edit()
+            self.paint_tiles(x, y, erase)
+        elif self.tool == "fill":
+            self.fill_area(x, y, " " if erase else self.selected_tile)
+        else:
+            self.shape_start = (x, y)
+            self.shape_erase = erase
+
+    def finish_tool(self, x, y):
+        if self.shape_start is not None:
+            tile = " " if self.shape_erase else self.selected_tile
+            if self.tool == "line":
+                self.draw_line(*self.shape_start, x, y, tile)
+            else:
+                self.draw_rectangle(*self.shape_start, x, y, tile, hollow=self.tool == "hollow")
+            self.shape_start = None
+        self.end_edit()
+
+    def fill_area(self, x, y, tile):
+        # Flood fills the tiles connected to (x, y) as one undo step
+        if not self.tilemap.in_bounds(x, y) or self.get_tile(x, y) == tile:
+            return
+        self.end_edit()
+        self.begin_edit()
+        runs = self.tilemap.flood(x, y)
+        self.edit.record_runs(self.tilemap, self.entity_properties, runs)
+        code = CODES.get(tile, EMPTY)
+        for row, start, stop in runs:
+            self.tilemap.cells[row, start:stop] = code
+        self.changed_many(rects=[(start, row, stop - start, 1) for row, start, stop in runs])
+        if tile not in ENTITY_TILES:
+            # The edit recorded exactly the entities inside the area
+            for cell in self.edit.entities:
+                self.entity_properties.pop(cell, None)
+        self.end_edit()
+
+    def draw_rectangle(self, x1, y1, x2, y2, tile, hollow=False):
+        x, y = min(x1, x2), min(y1, y2)
+        w, h = abs(x2 - x1) + 1, abs(y2 - y1) + 1
+        if hollow and w > 2 and h > 2:
+            parts = [(x, y, w, 1), (x, y + h - 1, w, 1), (x, y + 1, 1, h - 2), (x + w - 1, y + 1, 1, h - 2)]
+        else:
+            parts = [(x, y, w, h)]
+        self.end_edit()
+        self.begin_edit()
+        for part in parts:
+            self.fill_cells(*part, tile)
+        self.end_edit()
+
+    def draw_line(self, x1, y1, x2, y2, tile):
+        cols, rows = line_cells(x1, y1, x2, y2)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        cols, rows = cols[inside], rows[inside]
+        if not len(cols):
+            return
+        self.end_edit()
+        self.begin_edit()
+        self.edit.record_cells(self.tilemap, self.entity_properties, cols, rows)
+        self.tilemap.cells[rows, cols] = CODES.get(tile, EMPTY)
+        self.changed_many(cells=(cols, rows))
+        if tile not in ENTITY_TILES:
+            for cell in self.edit.entities:
+                self.entity_properties.pop(cell, None)
+        self.end_edit()
 
     def draw(self):
         self.screen.fill(COLORS["background"])
-        # Draw grid tiles
-        tile_area = pygame.Rect(0, self.offset_y, SCREEN_WIDTH, SCREEN_HEIGHT - self.offset_y)
-        for y in range(self.rows):
-            for x in range(self.cols):
-                tile = self.grid[y][x]
-                color = TILE_TYPES.get(tile, ((255, 255, 255), "Unknown"))[0]
-                rect = pygame.Rect(
-                    self.offset_x + x * TILE_SIZE * self.zoom,
-                    self.offset_y + y * TILE_SIZE * self.zoom,
-                    TILE_SIZE * self.zoom,
-                    TILE_SIZE * self.zoom,
-                )
-                if tile_area.colliderect(rect):
-                    pygame.draw.rect(self.screen, color, rect)
-                    pygame.draw.rect(self.screen, COLORS["tile_border"], rect, 1)
-
-                    # Draw brush indicator on selected tile in palette (below)
-                    if tile == self.selected_tile:
-                        pygame.draw.rect(self.screen, COLORS["highlight"], rect, 3)
-
-                    # Draw entities with a red overlay
-                    if (x, y) in self.entity_properties:
-                        pygame.draw.rect(self.screen, (255, 0, 0, 100), rect, 3)
+        # Draw grid tiles from cached chunks, skipping chunks out of view
+        tile_area = pygame.Rect(0, UI_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT - 2 * UI_HEIGHT)
+        self.chunk_cache.draw(self.screen, tile_area)
 
         # Draw grid lines (optional)
         # for x in range(self.cols + 1):
@@ -482,6 +730,24 @@ class LevelEditor:
             self.screen.blit(s, r.topleft)
             pygame.draw.rect(self.screen, COLORS["highlight"], r, 2)
 
+        # Preview the rectangle or line being dragged
+        if self.shape_start is not None:
+            gx, gy = self.screen_to_grid(*pygame.mouse.get_pos())
+            x1, y1 = self.shape_start
+            size = TILE_SIZE * self.zoom
+            if self.tool == "line":
+                start = (self.offset_x + (x1 + 0.5) * size, self.offset_y + (y1 + 0.5) * size)
+                end = (self.offset_x + (gx + 0.5) * size, self.offset_y + (gy + 0.5) * size)
+                pygame.draw.line(self.screen, COLORS["highlight"], start, end, 2)
+            else:
+                r = pygame.Rect(
+                    self.offset_x + min(x1, gx) * size,
+                    self.offset_y + min(y1, gy) * size,
+                    (abs(gx - x1) + 1) * size,
+                    (abs(gy - y1) + 1) * size,
+                )
+                pygame.draw.rect(self.screen, COLORS["highlight"], r, 2)
+
         # Draw tile palette UI
         self.draw_palette()
 
@@ -521,99 +787,192 @@ class LevelEditor:
         pygame.draw.rect(self.screen, COLORS["status_bar_bg"], rect)
         status_text = (
             f"Selected: {self.selected_tile} ({TILE_TYPES[self.selected_tile][1]}) | "
-            f"Brush Size: {BRUSH_SIZES[self.brush_index]} | Zoom: {self.zoom:.2f} | "
+            f"Tool: {self.tool} | Brush Size: {BRUSH_SIZES[self.brush_index]} | Zoom: {self.zoom:.2f} | "
             f"Grid Size: {self.cols}x{self.rows} | "
+            f"{self.autosave_status()} | "
             "Ctrl+Z Undo, Ctrl+Y Redo, Ctrl+C Copy, Ctrl+V Paste, ESC Cancel Copy"
         )
         surf = self.font_small.render(status_text, True, COLORS["status_text"])
         self.screen.blit(surf, (10, SCREEN_HEIGHT - UI_HEIGHT + 20))
 
+    def autosave_status(self):
+        if self.autosave.last_saved is None:
+            return "Not autosaved"
+        return "Autosaved " + time.strftime("%H:%M:%S", time.localtime(self.autosave.last_saved))
+
     def clamp_offset(self):
         # Clamp offset to avoid showing blank outside grid
         grid_width = self.cols * TILE_SIZE * self.zoom
         grid_height = self.rows * TILE_SIZE * self.zoom
         self.offset_x = max(min(self.offset_x, SCREEN_WIDTH - 50), SCREEN_WIDTH - grid_width - 50)
-        self.offset_y = max(min(self.offset_y, SCREEN_HEIGHT - 50), UI_HEIGHT)
-
-    def save_undo(self):
-        if len(self.undo_stack) >= UNDO_LIMIT:
-            self.undo_stack.pop(0)
-        # Deep copy grid and entity_properties
-        grid_copy = [row[:] for row in self.grid]
-        entity_copy = dict(self.entity_properties)
-        self.undo_stack.append((grid_copy, entity_copy))
-        self.redo_stack.clear()
+        # Tall grids scroll up until their last row clears the status bar
+        bottom = SCREEN_HEIGHT - UI_HEIGHT
+        self.offset_y = max(min(self.offset_y, SCREEN_HEIGHT - 50), min(UI_HEIGHT, bottom - grid_height - 50))
+
+    def begin_edit(self):
+        # Changes until end_edit() are undone together
+        if self.edit is None:
+            self.edit = Edit()
+
+    def touch(self, x, y, w, h):
+        # Call before changing cells so the open edit keeps their old values
+        if self.edit is not None:
+            self.edit.record(self.tilemap, self.entity_properties, x, y, w, h)
+
+    def end_edit(self):
+        if self.edit is not None:
+            self.edit.finish(self.tilemap, self.entity_properties)
+            self.history.push(self.edit)
+            self.edit = None
+
+    def apply_edit(self, edit, undo):
+        if edit is None:
+            return
+        self.tilemap = edit.apply(self.tilemap, self.entity_properties, undo)
+        if edit.size is not None:
+            self.chunk_cache.clear()
+            self.dirty_chunks = None
+            self.autosave.rewrite()
+            return
+        self.changed_many(rects=edit.cells() + [(x, y, 1, 1) for x, y in edit.entities])
+
+    def changed(self, x, y, w=1, h=1):
+        # Every change to cells or entity markers goes through here
+        self.chunk_cache.invalidate(x, y, w, h)
+        keys = chunked_level.chunk_keys(x, y, w, h)
+        if self.dirty_chunks is not None:
+            self.dirty_chunks |= keys
+        self.autosave.changed(keys)
+
+    def changed_many(self, rects=(), cells=None):
+        # changed() for a whole flood, line or undo at once: rects of
+        # (x, y, w, h) and (cols, rows) arrays of cells are marked on a mask
+        # per chunk size, then each chunk is invalidated once
+        masks = []
+        for size in (CHUNK_TILES, chunked_level.CHUNK_SIZE):
+            mask = np.zeros((-(-self.rows // size), -(-self.cols // size)), bool)
+            for x, y, w, h in rects:
+                mask[max(y, 0) // size:(y + h - 1) // size + 1, max(x, 0) // size:(x + w - 1) // size + 1] = True
+            if cells is not None:
+                mask[cells[1] // size, cells[0] // size] = True
+            masks.append(mask)
+        self.chunk_cache.invalidate_mask(masks[0])
+        cys, cxs = np.nonzero(masks[1])
+        keys = set(zip(cxs.tolist(), cys.tolist()))
+        if self.dirty_chunks is not None:
+            self.dirty_chunks |= keys
+        self.autosave.changed(keys)
 
     def undo(self):
-        if self.undo_stack:
-            self.redo_stack.append((self.grid, self.entity_properties))
-            self.grid, self.entity_properties = self.undo_stack.pop()
+        self.end_edit()
+        self.apply_edit(self.history.undo(), undo=True)
 
     def redo(self):
-        if self.redo_stack:
-            self.undo_stack.append((self.grid, self.entity_properties))
-            self.grid, self.entity_properties = self.redo_stack.pop()
+        self.end_edit()
+        self.apply_edit(self.history.redo(), undo=False)
+
+    def load_level(self, file_path, source=None):
+        # source is read instead of file_path when restoring an autosave;
+        # the map is still saved to file_path
+        source = source or file_path
+        if source.endswith(chunked_level.EXTENSION):
+            self.tilemap, self.entity_properties = chunked_level.load(source)
+            self.dirty_chunks = set() if source == file_path else None
+        else:
+            with open(source, "r") as f:
+                data = json.load(f)
+            self.tilemap = TileMap.from_rows(["".join(row) for row in data["grid"]])
+            self.entity_properties = {tuple(map(int,k.split(","))):v for k,v in data.get("entities", {}).items()}
+            self.dirty_chunks = None
+        self.file_path = file_path
+        self.autosave.reset(autosave_path(file_path))
+        self.chunk_cache.clear()
+        self.offset_x = 0
+        self.offset_y = UI_HEIGHT
+        self.edit = None
+        self.history.clear()
+
+    def save_level(self, file_path):
+        if file_path.endswith(chunked_level.EXTENSION):
+            dirty = self.dirty_chunks if file_path == self.file_path else None
+            chunked_level.save(file_path, self.tilemap, self.entity_properties, dirty)
+            self.dirty_chunks = set()
+        else:
+            data = {
+                "grid": self.tilemap.to_grid(),
+                "entities": {f"{k[0]},{k[1]}": v for k, v in self.entity_properties.items()}
+            }
+            with open(file_path, "w") as f:
+                json.dump(data, f, indent=4)
+            self.dirty_chunks = None
+        if file_path != self.file_path:
+            self.autosave.reset(autosave_path(file_path))
+        self.file_path = file_path
 
     def load_level_dialog(self):
+        dialog_root()
         try:
-            file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+            file_path = filedialog.askopenfilename(filetypes=[("Level files", "*.json *" + chunked_level.EXTENSION)])
             if not file_path:
                 return
-            with open(file_path, "r") as f:
-                data = json.load(f)
-            self.grid = data["grid"]
-            self.cols = len(self.grid[0])
-            self.rows = len(self.grid)
-            self.entity_properties = {tuple(map(int,k.split(","))):v for k,v in data.get("entities", {}).items()}
-            self.offset_x = 0
-            self.offset_y = UI_HEIGHT
-            self.undo_stack.clear()
-            self.redo_stack.clear()
+            source = newer_autosave(file_path)
+            if source is not None and not messagebox.askyesno(
+                "Restore Autosave",
+                f"{source} is newer than this level, probably from a session that did not exit cleanly.\n\n"
+                "Restore the autosaved work? If not, it is kept under a new name.",
+            ):
+                source = None
+            self.load_level(file_path, source)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load level:\n{e}")
 
     def save_level_dialog(self):
+        dialog_root()
         try:
-            file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+            filetypes = [("JSON files", "*.json"), ("Chunked level files", "*" + chunked_level.EXTENSION)]
+            if self.cols * self.rows > LARGE_MAP_CELLS:
+                filetypes.reverse()
+            file_path = filedialog.asksaveasfilename(defaultextension=filetypes[0][1][1:], filetypes=filetypes)
             if not file_path:
                 return
-            data = {
-                "grid": self.grid,
-                "entities": {f"{k[0]},{k[1]}": v for k, v in self.entity_properties.items()}
-            }
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=4)
+            self.save_level(file_path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save level:\n{e}")
 
     def resize_grid_dialog(self):
+        dialog_root()
         try:
-            new_cols = simpledialog.askinteger("Resize Grid", "New width (columns):", initialvalue=self.cols, minvalue=5, maxvalue=100)
+            new_cols = simpledialog.askinteger("Resize Grid", "New width (columns):", initialvalue=self.cols, minvalue=5, maxvalue=MAX_GRID_SIZE)
             if new_cols is None:
                 return
-            new_rows = simpledialog.askinteger("Resize Grid", "New height (rows):", initialvalue=self.rows, minvalue=5, maxvalue=100)
+            new_rows = simpledialog.askinteger("Resize Grid", "New height (rows):", initialvalue=self.rows, minvalue=5, maxvalue=MAX_GRID_SIZE)
             if new_rows is None:
                 return
 
-            new_grid = [[" " for _ in range(new_cols)] for _ in range(new_rows)]
-            new_entity_props = {}
-
-            for y in range(min(self.rows, new_rows)):
-                for x in range(min(self.cols, new_cols)):
-                    new_grid[y][x] = self.grid[y][x]
-                    if (x, y) in self.entity_properties:
-                        new_entity_props[(x, y)] = self.entity_properties[(x, y)]
-
-            self.grid = new_grid
-            self.cols = new_cols
-            self.rows = new_rows
-            self.entity_properties = new_entity_props
-            self.offset_x = 0
-            self.offset_y = UI_HEIGHT
+            self.resize_grid(new_cols, new_rows)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to resize grid:\n{e}")
 
+    def resize_grid(self, new_cols, new_rows):
+        # The cells cut off by shrinking are kept in the undo history
+        self.end_edit()
+        self.begin_edit()
+        self.edit.size = ((self.cols, self.rows), (new_cols, new_rows))
+        self.touch(new_cols, 0, self.cols - new_cols, self.rows)
+        self.touch(0, new_rows, min(self.cols, new_cols), self.rows - new_rows)
+        self.tilemap = self.tilemap.resized(new_cols, new_rows)
+        for x, y in list(self.entity_properties):
+            if x >= new_cols or y >= new_rows:
+                del self.entity_properties[(x, y)]
+        self.end_edit()
+        self.chunk_cache.clear()
+        self.dirty_chunks = None
+        self.autosave.rewrite()
+        self.offset_x = 0
+        self.offset_y = UI_HEIGHT
+
     def show_help(self):
+        dialog_root()
         messagebox.showinfo("Help",
             "Level Editor Controls:\n"
             "- Left Click: Paint selected tile\n"
@@ -622,6 +981,7 @@ class LevelEditor:
             "- Middle Mouse Drag: Pan\n"
             "- Number Keys 1-6: Select tile type\n"
             "- B: Change brush size\n"
+            "- P / F / R / H / L: Brush, flood fill, rectangle, hollow rectangle, line\n"
             "- E: Edit entity properties on tile\n"
             "- Ctrl+Z: Undo\n"
             "- Ctrl+Y: Redo\n"
@@ -639,15 +999,7 @@ class LevelEditor:
         if not self.copy_rect:
             return
         rx, ry, rw, rh = self.copy_rect
-        self.clipboard = []
-        for y in range(ry, ry + rh):
-            row = []
-            for x in range(rx, rx + rw):
-                if 0 <= x < self.cols and 0 <= y < self.rows:
-                    row.append(self.grid[y][x])
-                else:
-                    row.append(" ")
-            self.clipboard.append(row)
+        self.clipboard = self.tilemap.region(rx, ry, rw, rh)
 
         # Also copy entities inside region
         self.clipboard_entities = {}
@@ -661,20 +1013,21 @@ class LevelEditor:
         mx, my = pygame.mouse.get_pos()
         gx, gy = self.screen_to_grid(mx, my)
 
-        self.save_undo()
-
-        for y, row in enumerate(self.clipboard):
-            for x, tile in enumerate(row):
-                tx, ty = gx + x, gy + y
-                if 0 <= tx < self.cols and 0 <= ty < self.rows:
-                    self.grid[ty][tx] = tile
-                    # Remove old entity if present
-                    if (tx, ty) in self.entity_properties:
-                        self.entity_properties.pop((tx, ty))
+        self.end_edit()
+        self.begin_edit()
+        self.touch(gx, gy, self.clipboard.cols, self.clipboard.rows)
+        self.tilemap.paste(self.clipboard, gx, gy)
+        # Remove old entities under the pasted area
+        for tx, ty in list(self.entity_properties):
+            if gx <= tx < gx + self.clipboard.cols and gy <= ty < gy + self.clipboard.rows:
+                self.entity_properties.pop((tx, ty))
         for (ex, ey), props in self.clipboard_entities.items():
             nx, ny = gx + ex, gy + ey
             if 0 <= nx < self.cols and 0 <= ny < self.rows:
+                self.edit.record_entity(self.entity_properties, nx, ny)
                 self.entity_properties[(nx, ny)] = props
+        self.changed(gx, gy, self.clipboard.cols, self.clipboard.rows)
+        self.end_edit()
 
         self.copy_mode = False
         self.copy_start = None
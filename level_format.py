@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+
+# Compiled level layout: header, one byte per cell in row-major order, the
+# entity table, then a JSON object of entity properties keyed "col,row".
+# Entity cells are stored as empty in the tile array.
+MAGIC = b"MLVL"
+VERSION = 1
+HEADER = struct.Struct("<4sBIIII")  # magic, version, cols, rows, entity count, props length
+ENTITY = struct.Struct("<cII")  # tile char, col, row
+EXTENSION = ".mlvl"
+CACHE_DIR = ".level_cache"
+
+TILE_CODES = " GWPECS#M"
+ENTITY_TILES = "ECM"
+EMPTY = 0
+
+ENCODE = bytes(TILE_CODES.index(chr(i)) if chr(i) in TILE_CODES else EMPTY for i in range(256))
+DECODE = bytes(TILE_CODES, "ascii") + bytes(256 - len(TILE_CODES))
+ENTITY_PATTERN = re.compile(("[" + ENTITY_TILES + "]").encode())
+
+
+class CompiledLevel:
+    def __init__(self, cols, rows, tiles, entities, source=None):
+        self.cols = cols
+        self.rows = rows
+        self.tiles = tiles  # bytes-like, cols * rows tile codes
+        self.entities = entities  # list of (tile char, col, row, props)
+        self.source = source  # Keeps a backing mmap alive
+
+    @classmethod
+    def from_rows(cls, rows, entity_props=None):
+        # entity_props maps (col, row) to the editor's property dict
+        entity_props = entity_props or {}
+        cols = max((len(row) for row in rows), default=0)
+        text = "".join(row.ljust(cols) for row in rows).encode("ascii", "replace")
+
+        entities = []
+        for match in ENTITY_PATTERN.finditer(text):
+            row, col = divmod(match.start(), cols)
+            char = match.group().decode()
+            entities.append((char, col, row, entity_props.get((col, row), {})))
+        text = ENTITY_PATTERN.sub(b" ", text)
+
+        return cls(cols, len(rows), text.translate(ENCODE), entities)
+
+    def to_rows(self):
+        grid = bytearray(bytes(self.tiles).translate(DECODE))
+        for char, col, row, _ in self.entities:
+            grid[row * self.cols + col] = ord(char)
+        return [grid[r * self.cols:(r + 1) * self.cols].decode("ascii") for r in range(self.rows)]
+
+    def to_bytes(self):
+        table = b"".join(ENTITY.pack(char.encode("ascii"), col, row) for char, col, row, _ in self.entities)
+        props = {f"{col},{row}": p for _, col, row, p in self.entities if p}
+        encoded = json.dumps(props).encode("utf-8") if props else b""
+        header = HEADER.pack(MAGIC, VERSION, self.cols, self.rows, len(self.entities), len(encoded))
+        return b"".join([header, bytes(self.tiles), table, encoded])
+
+
+def compile_source(path):
+    if path.endswith(".mlvc"):
+        # Chunked files written by the editor for big maps
+        from chunked_level import compile_chunked
+        return compile_chunked(path)
+    if path.endswith(".json"):
+        # Files written by LevelEditor.save_level_dialog
+        with open(path, "r") as f:
+            data = json.load(f)
+        props = {tuple(map(int, k.split(","))): v for k, v in data.get("entities", {}).items()}
+        return CompiledLevel.from_rows(["".join(row) for row in data["grid"]], props)
+    with open(path, "r") as f:
+        return CompiledLevel.from_rows([line.rstrip("\r\n") for line in f])
+
+
+def write_compiled(level, path):
+    # Written to a temporary file first so readers never see half a level
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(level.to_bytes())
+    os.replace(temp_path, path)
+
+
+def load_compiled(path, writable=False):
+    # writable maps the file copy-on-write: pages are read from disk on
+    # demand and changes never reach the file
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+    magic, version, cols, rows, entity_count, props_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} compiled level")
+
+    offset = HEADER.size
+    tiles = memoryview(data)[offset:offset + cols * rows]
+    offset += cols * rows
+
+    table = data[offset:offset + entity_count * ENTITY.size]
+    offset += len(table)
+    props = json.loads(data[offset:offset + props_length]) if props_length else {}
+    chars = {char.encode("ascii"): char for char in ENTITY_TILES}
+    entities = [(chars[char], col, row, {}) for char, col, row in ENTITY.iter_unpack(table)]
+    if props:
+        index = {(col, row): i for i, (_, col, row, _) in enumerate(entities)}
+        for key, value in props.items():
+            i = index.get(tuple(map(int, key.split(","))))
+            if i is not None:
+                entities[i] = entities[i][:3] + (value,)
+    return CompiledLevel(cols, rows, tiles, entities, source=data)
+
+
+def cached_level(path, cache_dir=CACHE_DIR, writable=False):
+    # Compiles a .txt or .json level once per distinct source content
+    if path.endswith(EXTENSION):
+        return load_compiled(path, writable)
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    # The format version is part of the key so a format change recompiles
+    # instead of failing on stale cache entries
+    cache_path = os.path.join(cache_dir, f"{digest}-v{VERSION}{EXTENSION}")
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        write_compiled(compile_source(path), cache_path)
+    return load_compiled(cache_path, writable)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile levels to the binary .mlvl format")
+    parser.add_argument("sources", nargs="+", help=".txt, editor .json or .mlvc level files")
+    parser.add_argument("-o", "--output-dir", help="Defaults to next to each source")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        directory = args.output_dir or os.path.dirname(source)
+        name = os.path.splitext(os.path.basename(source))[0] + EXTENSION
+        output = os.path.join(directory, name)
+        write_compiled(compile_source(source), output)
+        print(f"{source} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+from level_format import cached_level, EXTENSION
+
+LEVEL_EXTENSIONS = (".txt", ".json", ".mlvc", EXTENSION)
+
+
+def load_layout(path):
+    # Text and editor files are compiled once and cached by content hash.
+    # The tiles stay memory-mapped, so huge levels load lazily.
+    return cached_level(path, writable=True)
+
+
+def find_levels(directory, include_maps=True):
+    # Yields (name, source) for every level the game knows about, where
+    # source is a list of rows or a path for load_layout
+    if include_maps:
+        from maps import levels
+        for index, layout in enumerate(levels):
+            yield f"maps.levels[{index}]", list(layout)
+
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(LEVEL_EXTENSIONS):
+                yield os.path.join(directory, name), os.path.join(directory, name)
@@ -1,10 +1,54 @@
+import argparse
+import sys
+import time
 import pygame
-from settings import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+from settings import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, FPS, PHYSICS_HZ, RENDER_FPS, VSYNC, IDLE_FPS, MAX_FRAME_TIME,
+)
 from level import Level
 from menu import Menu
+from inputs import KeyboardInput, ScriptedInput
+from replay import InputRecorder, save_replay, load_replay
+from profiler import Profiler, PerfOverlay, OVERLAY_KEY
+
+parser = argparse.ArgumentParser(description="Maro platformer")
+parser.add_argument("--record", metavar="FILE", help="Record every physics tick of input to FILE")
+parser.add_argument("--replay", metavar="FILE", help="Play back a recorded input file")
+parser.add_argument("--fast", action="store_true", help="With --replay, simulate headless as fast as possible")
+parser.add_argument("--profile", metavar="FILE", help="Write frame timing statistics to FILE as JSON on exit")
+args = parser.parse_args()
+
+
+def load_level_layout(name):
+    # Replays name either an index into maps.levels or a level file
+    if name.isdigit():
+        from maps import levels
+        return levels[int(name)]
+    from level_loader import load_layout
+    return load_layout(name)
+
+
+replay_masks = None
+if args.replay:
+    replay_level, replay_hz, replay_masks = load_replay(args.replay)
+    if replay_hz != PHYSICS_HZ:
+        sys.exit(f"{args.replay} was recorded at {replay_hz} Hz, the game runs at {PHYSICS_HZ} Hz")
+
+    if args.fast:
+        from headless import simulate
+        start = time.perf_counter()
+        level = simulate(load_level_layout(replay_level), replay_masks)
+        elapsed = time.perf_counter() - start
+        player = level.player
+        print(f"Replayed {len(replay_masks)} ticks in {elapsed:.3f}s")
+        print(f"position={player.rect.topleft} score={player.score} health={player.health} lives={player.lives}")
+        sys.exit()
 
 pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+if VSYNC:
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+else:
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 clock = pygame.time.Clock()
 pygame.display.set_caption("Maro")
 
@@ -12,6 +56,22 @@ menu = Menu(screen)
 state = "menu"
 level = None
 current_level_index = 0
+recorder = None
+profiler = Profiler()
+overlay = PerfOverlay(profiler)
+section = profiler.section
+
+# Physics runs in fixed steps; rendering happens as often as RENDER_FPS allows
+step_time = 1 / PHYSICS_HZ
+step_dt = FPS / PHYSICS_HZ
+accumulator = 0.0
+focused = True
+
+if replay_masks is not None:
+    level = Level(load_level_layout(replay_level), screen, ScriptedInput(replay_masks), profiler)
+    state = "game"
+    clock.tick()
+    profiler.restart()
 
 running = True
 while running:
@@ -19,32 +79,69 @@ while running:
         action = menu.run()
         if action == "start":
             from maps import levels
-            level = Level(levels[current_level_index], screen)
+            input_source = KeyboardInput()
+            if args.record:
+                recorder = input_source = InputRecorder(input_source)
+            level = Level(levels[current_level_index], screen, input_source, profiler)
             state = "game"
+            accumulator = 0.0
+            clock.tick()
+            profiler.restart()
         elif action == "quit":
             running = False
 
     elif state == "game":
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                state = "paused"
+        with section("input"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    state = "paused"
+                elif event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+                    overlay.toggle()
+                    level.redraw_all = True
+                elif event.type == pygame.WINDOWFOCUSLOST:
+                    focused = False
+                elif event.type == pygame.WINDOWFOCUSGAINED:
+                    focused = True
+
+        frame_time = clock.tick(RENDER_FPS if focused else IDLE_FPS) / 1000
+        accumulator += min(frame_time, MAX_FRAME_TIME)
+        while accumulator >= step_time:
+            level.update(step_dt)
+            accumulator -= step_time
 
-        screen.fill((135, 206, 235))
-        level.run()
+        dirty = level.draw(accumulator / step_time)
+        with section("overlay"):
+            overlay_rect = overlay.draw(screen)
+        if overlay_rect is not None:
+            dirty.append(overlay_rect)
 
         if level.player.health <= 0 or level.player.lives <= 0:
             state = "menu"
+        if replay_masks is not None and level.input_source.finished:
+            running = False
 
-        pygame.display.update()
-        clock.tick(FPS)
+        with section("display"):
+            if level.dirty_rects:
+                pygame.display.update(dirty)
+            else:
+                pygame.display.update()
+        profiler.end_frame()
 
     elif state == "paused":
         action = menu.pause()
         if action == "resume":
             state = "game"
+            level.redraw_all = True
+            clock.tick()
+            profiler.restart()
         elif action == "quit":
             running = False
 
+if recorder is not None:
+    save_replay(args.record, recorder.masks, str(current_level_index), PHYSICS_HZ)
+if args.profile:
+    profiler.save(args.profile)
+
 pygame.quit()
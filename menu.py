@@ -1,44 +1,53 @@
 import pygame
 
+# Events after which the window contents may need to be drawn again
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED)
+
 class Menu:
     def __init__(self, screen):
         self.screen = screen
         self.font = pygame.font.SysFont("Arial", 40)
 
-    def run(self):
-        while True:
-            self.screen.fill((0, 0, 0))
-            title = self.font.render("Maro Platformer", True, (255, 255, 255))
-            start = self.font.render("Press ENTER to Start", True, (255, 255, 255))
-            quit_game = self.font.render("Press ESC to Quit", True, (255, 255, 255))
-            self.screen.blit(title, (250, 150))
-            self.screen.blit(start, (220, 250))
-            self.screen.blit(quit_game, (220, 300))
-            pygame.display.flip()
+        # Menu text never changes, so each screen is rendered once up front
+        self.title_screen = self.render_screen((0, 0, 0), [
+            ("Maro Platformer", (250, 150)),
+            ("Press ENTER to Start", (220, 250)),
+            ("Press ESC to Quit", (220, 300)),
+        ])
+        self.pause_screen = self.render_screen((30, 30, 30), [
+            ("Paused - Press ESC to Resume", (150, 200)),
+            ("Press Q to Quit", (200, 250)),
+        ])
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return "quit"
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        return "start"
-                    elif event.key == pygame.K_ESCAPE:
-                        return "quit"
+    def render_screen(self, background, lines):
+        surface = pygame.Surface(self.screen.get_size())
+        surface.fill(background)
+        for text, pos in lines:
+            surface.blit(self.font.render(text, True, (255, 255, 255)), pos)
+        return surface.convert() if pygame.display.get_surface() else surface
 
-    def pause(self):
+    def show(self, surface, actions):
+        # Sleeps in event.wait() until a key in actions is pressed
+        self.screen.blit(surface, (0, 0))
+        pygame.display.flip()
         while True:
-            self.screen.fill((30, 30, 30))
-            text = self.font.render("Paused - Press ESC to Resume", True, (255, 255, 255))
-            quit_text = self.font.render("Press Q to Quit", True, (255, 255, 255))
-            self.screen.blit(text, (150, 200))
-            self.screen.blit(quit_text, (200, 250))
-            pygame.display.flip()
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                return "quit"
+            if event.type == pygame.KEYDOWN and event.key in actions:
+                return actions[event.key]
+            if event.type in REDRAW_EVENTS:
+                self.screen.blit(surface, (0, 0))
+                pygame.display.flip()
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return "quit"
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        return "resume"
-                    elif event.key == pygame.K_q:
-                        return "quit"
+    def run(self):
+        return self.show(self.title_screen, {
+            pygame.K_RETURN: "start",
+            pygame.K_ESCAPE: "quit",
+        })
+
+    def pause(self):
+        return self.show(self.pause_screen, {
+            pygame.K_ESCAPE: "resume",
+            pygame.K_q: "quit",
+        })
@@ -1,13 +1,19 @@
 import pygame
-from settings import TILE_SIZE, GRAVITY, PLAYER_SPEED, JUMP_POWER, MAX_LIVES
+from settings import GRAVITY, PLAYER_SPEED, JUMP_POWER, MAX_LIVES
+from inputs import KeyboardInput
+import assets
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, input_source=None):
         super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill((255, 100, 100))
+        self.image = assets.solid((255, 100, 100))
         self.rect = self.image.get_rect(topleft=(x, y))
 
+        # Sub-pixel position; prev_pos is kept for render interpolation
+        self.pos = pygame.math.Vector2(x, y)
+        self.prev_pos = pygame.math.Vector2(x, y)
+
+        self.input = input_source or KeyboardInput()
         self.direction = pygame.math.Vector2(0, 0)
         self.on_ground = False
 
@@ -16,7 +22,7 @@ class Player(pygame.sprite.Sprite):
         self.score = 0
 
     def handle_input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.input.get_pressed()
         if keys[pygame.K_LEFT]:
             self.direction.x = -PLAYER_SPEED
         elif keys[pygame.K_RIGHT]:
@@ -28,23 +34,29 @@ class Player(pygame.sprite.Sprite):
             self.direction.y = -JUMP_POWER
             self.on_ground = False
 
-    def apply_gravity(self):
-        self.direction.y += GRAVITY
-        self.rect.y += self.direction.y
-
-    def check_collision(self, tiles):
-        for tile in tiles:
-            if self.rect.colliderect(tile.rect):
-                if self.direction.y > 0:
-                    self.rect.bottom = tile.rect.top
-                    self.direction.y = 0
-                    self.on_ground = True
-                elif self.direction.y < 0:
-                    self.rect.top = tile.rect.bottom
-                    self.direction.y = 0
-
-    def update(self, tiles):
+    def apply_gravity(self, dt=1.0):
+        self.direction.y += GRAVITY * dt
+
+    def move(self, tiles, dt=1.0):
+        # tiles is a TileMap; the swept move stops at walls, floors and
+        # ceilings even when a step is longer than a tile
+        x, y, hit_x, hit_y = tiles.move(
+            self.pos.x, self.pos.y, self.rect.width, self.rect.height,
+            self.direction.x * dt, self.direction.y * dt,
+        )
+        self.on_ground = hit_y and self.direction.y > 0
+        if hit_y:
+            self.direction.y = 0
+        self.pos.update(x, y)
+        self.rect.topleft = (round(x), round(y))
+
+    def interpolated_rect(self, alpha):
+        pos = self.prev_pos.lerp(self.pos, alpha)
+        return self.rect.move(round(pos.x) - self.rect.x, round(pos.y) - self.rect.y)
+
+    def update(self, tiles, dt=1.0):
+        # dt is the step length in 1/FPS frames
+        self.prev_pos.update(self.pos)
         self.handle_input()
-        self.rect.x += self.direction.x
-        self.apply_gravity()
-        self.check_collision(tiles)
+        self.apply_gravity(dt)
+        self.move(tiles, dt)
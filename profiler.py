@@ -0,0 +1,131 @@
+import json
+import time
+from collections import deque
+import numpy as np
+import pygame
+from settings import FPS, PROFILE_WINDOW
+
+OVERLAY_KEY = pygame.K_F3
+OVERLAY_POS = (10, 90)
+OVERLAY_REFRESH = 15  # Frames between overlay redraws
+GRAPH_HEIGHT = 60
+GRAPH_SCALE = 2 * 1000 / FPS  # Milliseconds at the top of the graph
+COLUMN_X = (160, 210, 260)  # Right edges of the avg, p95 and p99 columns
+
+
+class Section:
+    # Context manager that adds its elapsed time to one profiler section
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class Profiler:
+    # Per-frame timings by section over a rolling window of frames. A
+    # section can run several times in one frame (physics steps, dirty
+    # rects); its times are summed for the frame.
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self.sections = {}
+        self.history = {}  # name -> deque of seconds per frame
+        self.frames = deque(maxlen=window)
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def section(self, name):
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+        return section
+
+    def restart(self):
+        # Call after a pause so the time spent there is not counted
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.frames.append(now - self.frame_start)
+        self.frame_start = now
+        for name in self.current.keys() - self.history.keys():
+            self.history[name] = deque([0.0] * (len(self.frames) - 1), maxlen=self.window)
+        for name, times in self.history.items():
+            times.append(self.current.get(name, 0.0))
+        self.current = {}
+
+    def stats(self):
+        # {section: {"avg", "p95", "p99", "max"}} in milliseconds; "frame"
+        # is the whole frame including time spent waiting on the clock
+        stats = {}
+        for name, times in [("frame", self.frames)] + sorted(self.history.items()):
+            if not times:
+                continue
+            ms = np.array(times) * 1000
+            p95, p99 = np.percentile(ms, [95, 99])
+            stats[name] = {"avg": float(ms.mean()), "p95": float(p95), "p99": float(p99), "max": float(ms.max())}
+        return stats
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"frames": len(self.frames), "sections": self.stats()}, f, indent=2)
+
+
+class PerfOverlay:
+    # Opaque panel with the profiler's table and a frame-time graph. It is
+    # re-rendered every OVERLAY_REFRESH frames and blitted in between.
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.visible = False
+        self.font = None
+        self.panel = None
+        self.age = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.panel = None
+
+    def render(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont("Arial", 14)
+        font = self.font
+        rows = [("section", "avg", "p95", "p99")]
+        rows += [(name, f"{s['avg']:.2f}", f"{s['p95']:.2f}", f"{s['p99']:.2f}") for name, s in self.profiler.stats().items()]
+
+        # Rendered cell by cell so the columns line up in any font
+        line_height = font.get_linesize()
+        width = max(COLUMN_X[-1] + 5, self.profiler.window + 10)
+        panel = pygame.Surface((width, len(rows) * line_height + GRAPH_HEIGHT + 15))
+        panel.fill((20, 20, 20))
+        for i, row in enumerate(rows):
+            y = 5 + i * line_height
+            panel.blit(font.render(row[0], True, (255, 255, 255)), (5, y))
+            for text, right in zip(row[1:], COLUMN_X):
+                cell = font.render(text, True, (255, 255, 255))
+                panel.blit(cell, (right - cell.get_width(), y))
+
+        # One column per frame; the line marks the FPS frame budget
+        bottom = panel.get_height() - 5
+        budget = bottom - round(GRAPH_HEIGHT * 1000 / FPS / GRAPH_SCALE)
+        pygame.draw.line(panel, (80, 80, 80), (5, budget), (width - 5, budget))
+        for x, frame in enumerate(self.profiler.frames, 5):
+            height = min(round(frame * 1000 / GRAPH_SCALE * GRAPH_HEIGHT), GRAPH_HEIGHT)
+            color = (80, 220, 80) if frame * FPS <= 1 else (230, 70, 70)
+            pygame.draw.line(panel, color, (x, bottom), (x, bottom - height))
+        self.panel = panel
+
+    def draw(self, surface):
+        # Returns the screen rect drawn, or None when hidden
+        if not self.visible:
+            return None
+        self.age += 1
+        if self.panel is None or self.age >= OVERLAY_REFRESH:
+            self.render()
+            self.age = 0
+        return surface.blit(self.panel, OVERLAY_POS)
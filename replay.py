@@ -0,0 +1,59 @@
+import struct
+from inputs import to_mask
+
+# File layout: header, level name, then (mask, run length) pairs, one run
+# per stretch of physics ticks with the same keys held.
+MAGIC = b"MREP"
+VERSION = 1
+HEADER = struct.Struct("<4sBHIH")  # magic, version, physics hz, ticks, name length
+RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+
+class InputRecorder:
+    # Wraps another input source and keeps the key mask of every tick
+    def __init__(self, source):
+        self.source = source
+        self.masks = []
+
+    def get_pressed(self):
+        pressed = self.source.get_pressed()
+        self.masks.append(to_mask(pressed))
+        return pressed
+
+
+def encode_runs(masks):
+    runs = []
+    for mask in masks:
+        if runs and runs[-1][0] == mask and runs[-1][1] < MAX_RUN:
+            runs[-1][1] += 1
+        else:
+            runs.append([mask, 1])
+    return runs
+
+
+def save_replay(path, masks, level_name, physics_hz):
+    name = level_name.encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, physics_hz, len(masks), len(name)))
+        f.write(name)
+        f.write(b"".join(RUN.pack(mask, count) for mask, count in encode_runs(masks)))
+
+
+def load_replay(path):
+    # Returns (level name, physics hz, list of per-tick key masks)
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, physics_hz, ticks, name_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay file")
+    offset = HEADER.size
+    level_name = data[offset:offset + name_length].decode("utf-8")
+    offset += name_length
+
+    masks = []
+    for mask, count in RUN.iter_unpack(data[offset:]):
+        masks.extend([mask] * count)
+    if len(masks) != ticks:
+        raise ValueError(f"{path} is truncated: expected {ticks} ticks, found {len(masks)}")
+    return level_name, physics_hz, masks
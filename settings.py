@@ -4,6 +4,7 @@ SCREEN_HEIGHT = 600
 GRAVITY = 0.8
 PLAYER_SPEED = 5
 JUMP_POWER = 15
+ENEMY_SPEED = 1.5
 
 TILE_TYPES = {
     "G": (50, 200, 50),    # Ground
@@ -24,3 +25,24 @@ TILE_NAMES = {
     "S": "Spike",
     " ": "Empty",
 }
+FPS = 60
+MAX_LIVES = 3
+BACKGROUND_COLOR = (135, 206, 235)
+DIRTY_RECTS = False  # Present only changed screen regions each frame
+BROADPHASE_CELL = 4 * TILE_SIZE  # Spatial hash bucket size for entity collisions
+
+# Level streaming, in 512px chunks
+STREAM_RADIUS = 2  # Chunks around the player that keep their enemies loaded
+MAX_LOADED_CHUNKS = 64
+MAX_BAKED_CHUNKS = 64  # Cached static-layer surfaces, 1 MB each
+
+USE_TILE_ICONS = False  # Draw tiles with icons/*.png instead of flat colors
+
+# Main loop timing. Physics constants above are tuned per 1/FPS frame and
+# are scaled to the fixed PHYSICS_HZ step.
+PHYSICS_HZ = 120
+RENDER_FPS = FPS  # 0 renders uncapped
+VSYNC = False
+IDLE_FPS = 10  # Render rate while the window is unfocused
+MAX_FRAME_TIME = 0.25  # Seconds of simulation allowed per rendered frame
+PROFILE_WINDOW = 240  # Frames kept for the performance overlay's statistics
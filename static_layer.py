@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pygame
+from settings import TILE_SIZE, MAX_BAKED_CHUNKS
+from tilemap import CODES
+
+CHUNK_SIZE = 512
+
+
+class StaticLayer:
+    # Pre-renders tiles that never move into chunk surfaces so drawing the
+    # level costs one blit per visible chunk instead of one per tile.
+    # Chunks are baked on first use, or ahead of time on a worker thread
+    # through prefetch(), and the least recently used ones are dropped.
+    def __init__(self, tilemap, images, chunk_size=CHUNK_SIZE, max_chunks=MAX_BAKED_CHUNKS):
+        self.tilemap = tilemap
+        self.images = {CODES[char]: image for char, image in images.items()}
+        self.chunk_size = chunk_size
+        self.chunk_tiles = chunk_size // TILE_SIZE
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()  # key -> Surface, or None when empty
+        self.pending = {}
+        self.executor = None
+
+    def render(self, key):
+        # Safe to call from the prefetch thread: it only reads the tile map
+        n = self.chunk_tiles
+        block = self.tilemap.cells[key[1] * n:(key[1] + 1) * n, key[0] * n:(key[0] + 1) * n]
+        chunk = None
+        for code, image in self.images.items():
+            rows, cols = np.nonzero(block == code)
+            if not len(rows):
+                continue
+            if chunk is None:
+                chunk = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+            chunk.blits([(image, (col * TILE_SIZE, row * TILE_SIZE)) for row, col in zip(rows.tolist(), cols.tolist())], False)
+        return chunk
+
+    def install(self, key, chunk):
+        if chunk is not None and pygame.display.get_surface() is not None:
+            chunk = chunk.convert_alpha()
+        self.chunks[key] = chunk
+        self.chunks.move_to_end(key)
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+
+    def get(self, key):
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+        future = self.pending.pop(key, None)
+        chunk = future.result() if future is not None else self.render(key)
+        self.install(key, chunk)
+        return chunk
+
+    def prefetch(self, keys):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        keys = set(keys)
+        for key in list(self.pending):
+            if key not in keys:
+                # Keep finished work, drop anything no longer nearby
+                future = self.pending.pop(key)
+                if future.done():
+                    self.install(key, future.result())
+                else:
+                    future.cancel()
+        for key in keys:
+            if key in self.chunks or key[0] < 0 or key[1] < 0:
+                continue
+            future = self.pending.get(key)
+            if future is None:
+                self.pending[key] = self.executor.submit(self.render, key)
+            elif future.done():
+                self.install(key, self.pending.pop(key).result())
+
+    def draw(self, surface, view=None):
+        if view is None:
+            view = surface.get_rect()
+        size = self.chunk_size
+        blits = []
+        for cy in range(max(view.top, 0) // size, (view.bottom - 1) // size + 1):
+            for cx in range(max(view.left, 0) // size, (view.right - 1) // size + 1):
+                chunk = self.get((cx, cy))
+                if chunk is not None:
+                    blits.append((chunk, (cx * size - view.x, cy * size - view.y)))
+        surface.blits(blits, False)
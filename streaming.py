@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from settings import STREAM_RADIUS, MAX_LOADED_CHUNKS
+from static_layer import CHUNK_SIZE
+import enemy
+
+
+class ChunkStreamer:
+    # Keeps enemies in the entity store only for chunks near the player. When
+    # a chunk is evicted its enemies are stored with their position and
+    # velocity and respawn in the same state later.
+    def __init__(self, level, spawns, chunk_size=CHUNK_SIZE, radius=STREAM_RADIUS, max_chunks=MAX_LOADED_CHUNKS):
+        self.level = level
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.max_chunks = max(max_chunks, (radius * 2 + 1) ** 2)
+        self.stored = {}  # key -> [(x, y, props, vx, vy)], vx None for a fresh enemy
+        self.loaded = OrderedDict()  # key -> {entity index}
+        self.chunk_of = {}  # entity index -> key of the loaded chunk it is listed in
+        self.center = None
+
+        for x, y, props in spawns:
+            self.stored.setdefault(self.key(x, y), []).append((x, y, props, None, 0.0))
+
+    def key(self, x, y):
+        return int(x // self.chunk_size), int(y // self.chunk_size)
+
+    def nearby(self, key, radius):
+        cx, cy = key
+        return [(cx + dx, cy + dy) for dy in range(-radius, radius + 1) for dx in range(-radius, radius + 1)]
+
+    def update(self, rect):
+        center = self.key(*rect.center)
+        if center == self.center:
+            return
+        self.center = center
+
+        for key in self.nearby(center, self.radius):
+            if key in self.loaded:
+                self.loaded.move_to_end(key)
+            else:
+                self.load(key)
+        while len(self.loaded) > self.max_chunks:
+            self.unload(next(iter(self.loaded)))
+
+        if self.level.static_layer is not None:
+            self.level.static_layer.prefetch(self.nearby(center, self.radius + 1))
+
+    def load(self, key):
+        store = self.level.entities
+        indices = self.loaded[key] = set()
+        for x, y, props, vx, vy in self.stored.pop(key, ()):
+            index = enemy.spawn(store, x, y, props, vx, vy)
+            # The store reuses the slots of enemies killed elsewhere, e.g.
+            # by falling off the map; drop them from their old chunk
+            old = self.chunk_of.get(index)
+            if old in self.loaded:
+                self.loaded[old].discard(index)
+            self.chunk_of[index] = key
+            indices.add(index)
+
+    def unload(self, key):
+        store = self.level.entities
+        for index in self.loaded.pop(key):
+            if not store.alive[index]:
+                del self.chunk_of[index]
+                continue
+            # An enemy that walked into another loaded chunk stays alive there
+            x, y = float(store.x[index]), float(store.y[index])
+            home = self.key(x, y)
+            if home in self.loaded:
+                self.loaded[home].add(index)
+                self.chunk_of[index] = home
+                continue
+            self.stored.setdefault(home, []).append((x, y, store.props[index], float(store.vx[index]), float(store.vy[index])))
+            store.kill(index)
+            del self.chunk_of[index]
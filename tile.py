@@ -1,9 +0,0 @@
-import pygame
-from settings import TILE_SIZE
-
-class Tile(pygame.sprite.Sprite):
-    def __init__(self, x, y, color):
-        super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(topleft=(x, y))
@@ -0,0 +1,219 @@
+import math
+import numpy as np
+import pygame
+from settings import TILE_SIZE
+from level_format import TILE_CODES, ENCODE, DECODE
+
+# Tile code table shared by the game, the editor and compiled levels
+CODES = {char: code for code, char in enumerate(TILE_CODES)}
+EMPTY = CODES[" "]
+COIN = CODES["C"]
+SOLID_CODES = frozenset(CODES[char] for char in "GPS")
+SOLID = np.zeros(256, bool)  # Lookup table for vectorized solid checks
+SOLID[list(SOLID_CODES)] = True
+MARK = 255  # Temporary code used while flood filling
+
+
+class TileMap:
+    # A level as a 2D uint8 array of tile codes, indexed [row, col]
+    def __init__(self, cols, rows, cells=None):
+        self.cells = np.zeros((rows, cols), np.uint8) if cells is None else cells
+
+    @property
+    def cols(self):
+        return self.cells.shape[1]
+
+    @property
+    def rows(self):
+        return self.cells.shape[0]
+
+    @classmethod
+    def from_rows(cls, rows):
+        cols = max((len(row) for row in rows), default=0)
+        text = "".join(row.ljust(cols) for row in rows).encode("ascii", "replace")
+        cells = np.frombuffer(text.translate(ENCODE), np.uint8).reshape(len(rows), cols)
+        return cls(cols, len(rows), cells.copy())
+
+    @classmethod
+    def from_compiled(cls, level):
+        # Shares the compiled tile buffer when it is writable (a
+        # copy-on-write mmap or a fresh bytearray) instead of copying it
+        cells = np.frombuffer(level.tiles, np.uint8).reshape(level.rows, level.cols)
+        if not cells.flags.writeable:
+            cells = cells.copy()
+        # Entities live in the compiled entity table, so put them back
+        if level.entities:
+            chars, cols, rows, _ = zip(*level.entities)
+            cells[list(rows), list(cols)] = [CODES[char] for char in chars]
+        return cls(level.cols, level.rows, cells)
+
+    def to_rows(self):
+        text = self.cells.tobytes().translate(DECODE).decode("ascii")
+        return [text[r * self.cols:(r + 1) * self.cols] for r in range(self.rows)]
+
+    def to_grid(self):
+        return [list(row) for row in self.to_rows()]
+
+    def copy(self):
+        return TileMap(self.cols, self.rows, self.cells.copy())
+
+    def in_bounds(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows
+
+    def get(self, col, row):
+        return TILE_CODES[self.cells[row, col]]
+
+    def set(self, col, row, char):
+        self.cells[row, col] = CODES.get(char, EMPTY)
+
+    def clip(self, col, row, width, height):
+        # Clamps a cell rectangle to the map, returning array slices
+        left, top = max(col, 0), max(row, 0)
+        right, bottom = min(col + width, self.cols), min(row + height, self.rows)
+        return slice(top, max(top, bottom)), slice(left, max(left, right))
+
+    def fill(self, col, row, width, height, char):
+        self.cells[self.clip(col, row, width, height)] = CODES.get(char, EMPTY)
+
+    def region(self, col, row, width, height):
+        # Copy of a rectangle; cells outside the map come back empty
+        out = TileMap(width, height)
+        rows, cols = self.clip(col, row, width, height)
+        out.cells[rows.start - row:rows.stop - row, cols.start - col:cols.stop - col] = self.cells[rows, cols]
+        return out
+
+    def paste(self, other, col, row):
+        rows, cols = self.clip(col, row, other.cols, other.rows)
+        self.cells[rows, cols] = other.cells[rows.start - row:rows.stop - row, cols.start - col:cols.stop - col]
+
+    def resized(self, cols, rows):
+        out = TileMap(cols, rows)
+        out.paste(self, 0, 0)
+        return out
+
+    def cell_range(self, rect):
+        # Slices of the cells a pixel rect overlaps
+        return self.clip(
+            rect.left // TILE_SIZE,
+            rect.top // TILE_SIZE,
+            (rect.right - 1) // TILE_SIZE - rect.left // TILE_SIZE + 1,
+            (rect.bottom - 1) // TILE_SIZE - rect.top // TILE_SIZE + 1,
+        )
+
+    def find(self, rect, code):
+        # (col, row) of every cell with this code under a pixel rect
+        rows, cols = self.cell_range(rect)
+        found_rows, found_cols = np.nonzero(self.cells[rows, cols] == code)
+        return list(zip((found_cols + cols.start).tolist(), (found_rows + rows.start).tolist()))
+
+    def solid_rects(self, rect):
+        # Collision rects are a few cells at most, so plain lists beat
+        # vectorizing here
+        rows, cols = self.cell_range(rect)
+        found = []
+        for row, codes in enumerate(self.cells[rows, cols].tolist(), rows.start):
+            for col, code in enumerate(codes, cols.start):
+                if code in SOLID_CODES:
+                    found.append(pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        return found
+
+    def solid_at(self, cols, rows, outside=False):
+        # Vectorized solid test for arrays of cells; cells off the map
+        # count as outside. Negative cells wrap to huge unsigned values, so
+        # one compare per axis does the bounds check.
+        height, width = self.cells.shape
+        inside = (cols.astype(np.uintp) < width) & (rows.astype(np.uintp) < height)
+        if inside.all():
+            return SOLID[self.cells[rows, cols]]
+        result = np.full(cols.shape, outside)
+        result[inside] = SOLID[self.cells[rows[inside], cols[inside]]]
+        return result
+
+    def sweep_axis(self, start, size, delta, cross_start, cross_size, vertical):
+        # Moves a box along one axis a tile line at a time, leading edge
+        # first, and stops against the first line with a solid cell across
+        # the box. The work depends on the distance moved, not the map size,
+        # and nothing is skipped however fast the box goes. Cells the box
+        # already overlaps and cells off the map never block.
+        # Returns (new start, hit).
+        limit, cross_limit = (self.rows, self.cols) if vertical else (self.cols, self.rows)
+        if delta > 0:
+            first = max(math.ceil((start + size) / TILE_SIZE), 0)
+            lines = range(first, min(math.ceil((start + size + delta) / TILE_SIZE), limit))
+        elif delta < 0:
+            first = min(math.floor(start / TILE_SIZE) - 1, limit - 1)
+            lines = range(first, max(math.floor((start + delta) / TILE_SIZE) - 1, -1), -1)
+        else:
+            return start, False
+
+        low = max(math.floor(cross_start / TILE_SIZE), 0)
+        high = min(math.ceil((cross_start + cross_size) / TILE_SIZE), cross_limit)
+        if low >= high:
+            return start + delta, False
+        for line in lines:
+            strip = self.cells[line, low:high] if vertical else self.cells[low:high, line]
+            if SOLID[strip].any():
+                return (line * TILE_SIZE - size if delta > 0 else (line + 1) * TILE_SIZE), True
+        return start + delta, False
+
+    def move(self, x, y, width, height, dx, dy):
+        # Swept move of a box through the solid tiles, x first then y.
+        # Returns (x, y, hit_x, hit_y).
+        x, hit_x = self.sweep_axis(x, width, dx, y, height, False)
+        y, hit_y = self.sweep_axis(y, height, dy, x, width, True)
+        return x, y, hit_x, hit_y
+
+    def run_end(self, row, col, step, code):
+        # First index from col in direction step whose cell is not code,
+        # searched in growing blocks so long runs stay vectorized
+        line = self.cells[row]
+        block = 64
+        while True:
+            stop = col + step * block
+            if step > 0:
+                segment = line[col:min(stop, self.cols)]
+            else:
+                segment = line[max(stop, -1) + 1:col + 1][::-1]
+            other = segment != code
+            index = int(other.argmax())
+            if other[index]:
+                return col + step * index
+            if not 0 <= stop < self.cols:
+                return -1 if step < 0 else self.cols
+            col = stop
+            block *= 2
+
+    def flood(self, col, row):
+        # Scanline flood fill: the 4-connected area of cells sharing the
+        # code at (col, row), as (row, start, stop) runs. The work grows
+        # with the area, not the map. The map is unchanged afterwards.
+        target = self.cells[row, col]
+        runs = []
+        seeds = [(col, row)]
+        while seeds:
+            col, row = seeds.pop()
+            if self.cells[row, col] != target:
+                continue
+            start = self.run_end(row, col, -1, target) + 1
+            stop = self.run_end(row, col, 1, target)
+            self.cells[row, start:stop] = MARK
+            runs.append((row, start, stop))
+            for next_row in (row - 1, row + 1):
+                if 0 <= next_row < self.rows:
+                    # One seed per run of matching cells next to this run
+                    match = np.concatenate(([False], self.cells[next_row, start:stop] == target))
+                    seeds.extend((start + offset, next_row) for offset in np.flatnonzero(match[1:] & ~match[:-1]).tolist())
+        for row, start, stop in runs:
+            self.cells[row, start:stop] = target
+        return runs
+
+    def collect(self, rect, code):
+        # Empties every matching cell under rect and returns their positions
+        # Usually nothing is there; a bytes scan of the few cells is the
+        # cheapest way to find out
+        if code not in self.cells[self.cell_range(rect)].tobytes():
+            return []
+        found = self.find(rect, code)
+        for col, row in found:
+            self.cells[row, col] = EMPTY
+        return found
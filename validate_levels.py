@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+from settings import TILE_SIZE, FPS, PHYSICS_HZ
+from level import Level
+from inputs import HeldInput, KEY_BITS
+from level_loader import find_levels, load_layout
+from tilemap import COIN
+
+STEP_DT = FPS / PHYSICS_HZ
+ACTION_TICKS = 8  # Each search move holds one input for this many ticks
+SETTLE_TICKS = PHYSICS_HZ * 3
+MAX_STATES = 200_000
+POSITION_BUCKET = 4  # Pixels per bucket when deduplicating visited states
+
+LEFT = KEY_BITS[pygame.K_LEFT]
+RIGHT = KEY_BITS[pygame.K_RIGHT]
+JUMP = KEY_BITS[pygame.K_SPACE]
+ACTIONS = [0, LEFT, RIGHT, JUMP, LEFT | JUMP, RIGHT | JUMP]
+
+
+def save_state(player):
+    return (player.pos.x, player.pos.y, player.direction.x, player.direction.y, player.on_ground)
+
+
+def load_state(player, state):
+    x, y, vx, vy, on_ground = state
+    player.pos.update(x, y)
+    player.rect.topleft = (round(x), round(y))
+    player.direction.update(vx, vy)
+    player.on_ground = on_ground
+
+
+def state_key(state):
+    x, y, _, vy, on_ground = state
+    return (int(x) // POSITION_BUCKET, int(y) // POSITION_BUCKET, round(vy), on_ground)
+
+
+def explore(layout):
+    # Breadth-first search over headless playthroughs from the spawn point
+    controls = HeldInput()
+    level = Level(layout, input_source=controls)
+    player = level.player
+    width, height = level.width, level.height
+    bounds = pygame.Rect(-TILE_SIZE, -height, width + TILE_SIZE * 2, height * 2 + TILE_SIZE)
+
+    coins = set(level.tilemap.find(pygame.Rect(0, 0, width, height), COIN))
+    collected = set()
+    cells = set()
+
+    def visit():
+        rect = player.rect
+        cells.add((rect.centerx // TILE_SIZE, rect.centery // TILE_SIZE))
+        collected.update(level.tilemap.find(rect, COIN))
+
+    # Let the player fall from the spawn point before exploring
+    for _ in range(SETTLE_TICKS):
+        player.update(level.tilemap, STEP_DT)
+        visit()
+        if player.on_ground or not bounds.colliderect(player.rect):
+            break
+    spawn_safe = player.on_ground
+
+    seen = set()
+    queue = deque()
+    if spawn_safe:
+        start = save_state(player)
+        seen.add(state_key(start))
+        queue.append(start)
+
+    truncated = False
+    while queue:
+        state = queue.popleft()
+        for action in ACTIONS:
+            load_state(player, state)
+            controls.hold(action)
+            for _ in range(ACTION_TICKS):
+                player.update(level.tilemap, STEP_DT)
+                visit()
+            if not bounds.colliderect(player.rect):
+                continue
+            next_state = save_state(player)
+            key = state_key(next_state)
+            if key in seen:
+                continue
+            if len(seen) >= MAX_STATES:
+                truncated = True
+                continue
+            seen.add(key)
+            queue.append(next_state)
+
+    return {
+        "spawn_safe": spawn_safe,
+        "reachable_cells": len(cells),
+        "states": len(seen),
+        "truncated": truncated,
+        "coins": len(coins),
+        "coins_collectable": len(collected),
+        "unreachable_coins": sorted(coins - collected),
+    }
+
+
+def validate(name, source):
+    start = time.perf_counter()
+    try:
+        layout = load_layout(source) if isinstance(source, str) else source
+        result = {"level": name, **explore(layout)}
+    except Exception as e:
+        return {"level": name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["solvable"] = result["spawn_safe"] and not result["unreachable_coins"]
+    result["ok"] = result["solvable"]
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every level can be played through")
+    parser.add_argument("directory", nargs="?", default="levels", help="Directory of .txt, editor .json and compiled .mlvl levels")
+    parser.add_argument("--no-maps", action="store_true", help="Skip the built-in maps.levels list")
+    parser.add_argument("--report", default="level_report.json", help="Where to write the JSON report")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    sources = list(find_levels(args.directory, include_maps=not args.no_maps))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(validate, name, source) for name, source in sources]
+        results = [future.result() for future in futures]
+
+    failed = [r for r in results if not r["ok"]]
+    report = {
+        "summary": {
+            "levels": len(results),
+            "passed": len(results) - len(failed),
+            "failed": len(failed),
+            "seconds": round(time.perf_counter() - start, 3),
+        },
+        "levels": results,
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for r in results:
+        status = "ok" if r["ok"] else "FAIL"
+        detail = r.get("error") or f"coins {r['coins_collectable']}/{r['coins']}, spawn {'safe' if r['spawn_safe'] else 'unsafe'}"
+        print(f"{status:4} {r['level']}: {detail}")
+    print(f"{report['summary']['passed']}/{len(results)} levels passed, report written to {args.report}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())